@@ -1,57 +1,48 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.document_loaders.text import TextLoader
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.runnables import RunnableWithMessageHistory
-from langchain_groq import ChatGroq
+from session_store import SessionStore, summarize_with
+from llm_client import get_llm
 from langchain.chains import create_retrieval_chain, create_history_aware_retriever
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agents.knowledge_index import KnowledgeIndex
 import os
 from dotenv import load_dotenv
 
 # 🔹 Load API keys
 load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
 os.environ["HF_TOKEN"] = os.getenv("HF_TOKEN")
 
-def create_chatbot():
-    """Create the OpenSpeak AI Coach Chatbot with contextual memory and retrieval."""
-    
-    # 🧠 Step 1: Initialize Groq LLM
-    llm = ChatGroq(
-        groq_api_key=groq_api_key,
-        model="mixtral-8x7b-32768",  # ✅ Correct and active model
-        temperature=0.3,
-    )
+# "fake" swaps the sentence-transformer for hash-based vectors (offline benchmarks, no model download)
+EMBEDDINGS_BACKEND = os.getenv("CHATBOT_EMBEDDINGS", "huggingface")
+# Stored in the index manifest; the knowledge base is re-embedded when it changes
+EMBEDDING_MODEL = "fake-384" if EMBEDDINGS_BACKEND == "fake" else "sentence-transformers/all-MiniLM-L6-v2"
 
-    # 🗂 Step 2: Load context
-    context_path = os.path.join(os.path.dirname(__file__), "context.txt")
-    if not os.path.exists(context_path):
-        raise FileNotFoundError(f"❌ context.txt not found at {context_path}")
 
-    loader = TextLoader(context_path, encoding="utf-8")
-    docs = loader.load()
+def create_embeddings():
+    if EMBEDDINGS_BACKEND == "fake":
+        return DeterministicFakeEmbedding(size=384)
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
 
-    # 🔹 Split into chunks for better retrieval
-    splitter = RecursiveCharacterTextSplitter(chunk_size=900, chunk_overlap=200)
-    splits = splitter.split_documents(docs)
+def create_chatbot(session_store: SessionStore | None = None):
+    """Create the OpenSpeak AI Coach Chatbot with contextual memory and retrieval."""
+    
+    # 🧠 Step 1: Initialize Groq LLM
+    llm = get_llm("mixtral-8x7b-32768", temperature=0.3)  # ✅ shared, rate-limited client
 
-    # 🔍 Step 3: Create embeddings & vector DB
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+    # 🔍 Step 2: Embeddings & persistent vector DB (only new/changed chunks are embedded)
+    embeddings = create_embeddings()
 
-    vector_db = Chroma.from_documents(
-        embedding=embeddings,
-        documents=splits,
-        collection_name="openspeak-chatbot",
-        persist_directory="./.chroma_chatbot"
-    )
+    index = KnowledgeIndex(embeddings, EMBEDDING_MODEL)
+    changes = index.sync()
+    print(f"📚 Knowledge index synced: {changes['added']} added, {changes['removed']} removed, "
+          f"{changes['unchanged']} unchanged")
 
-    retriever = vector_db.as_retriever(search_kwargs={"k": 4})
+    retriever = index.as_retriever(search_kwargs={"k": 4})
 
-    # 🧾 Step 4: Reformulation prompt (history-aware)
+    # 🧾 Step 3: Reformulation prompt (history-aware)
     reformulate_prompt = (
         "Given the chat history and the latest user question, "
         "rephrase the question into a standalone, clear query without answering it. "
@@ -66,7 +57,7 @@ def create_chatbot():
 
     history_aware_retriever = create_history_aware_retriever(llm, retriever, ref_prompt)
 
-    # 💬 Step 5: System prompt for chatbot personality
+    # 💬 Step 4: System prompt for chatbot personality
     system_prompt = (
         "You are OpenSpeak — a professional AI Speaking Coach. "
         "You help users improve public speaking, analyze their speech, and use the AI platform effectively. "
@@ -85,13 +76,14 @@ def create_chatbot():
     doc_chain = create_stuff_documents_chain(llm, qa_prompt)
     rag_chain = create_retrieval_chain(history_aware_retriever, doc_chain)
 
-    # 🧩 Step 6: Session-based memory
-    session_store = {}
+    # 🧩 Step 5: Session-based memory (bounded, older turns summarized)
+    if session_store is None:
+        session_store = SessionStore()
+    if session_store.summarize is None:
+        session_store.summarize = summarize_with(llm)
 
     def get_session_history(session_id: str) -> BaseChatMessageHistory:
-        if session_id not in session_store:
-            session_store[session_id] = ChatMessageHistory()
-        return session_store[session_id]
+        return session_store.get_history(session_id)
 
     conversational_chain = RunnableWithMessageHistory(
         rag_chain,
@@ -0,0 +1,55 @@
+from langchain.schema import SystemMessage, HumanMessage
+from llm_client import get_llm
+from agents.parsing import parse_agent_json, validate_section
+from timing import span
+
+MODEL = "qwen/qwen3-32b"
+# Bump whenever the prompt changes so cached results are not reused
+PROMPT_VERSION = "1"
+
+llm = get_llm(MODEL, temperature=0.2)
+
+SECTIONS = ("content", "delivery", "grammar")
+
+
+def build_messages(text: str):
+    prompt = f"""
+    You are an expert public speaking coach and language expert.
+    Analyze this speech ONCE and report on three separate areas, briefly and clearly:
+    - "content": main ideas, supporting examples, structure, clarity
+    - "delivery": tone & energy, pace & pauses, confidence (assume normal body language), audience engagement
+    - "grammar": grammar errors, vocabulary variety, sentence fluency, improvement tips
+
+    Respond STRICTLY in clean JSON like this:
+    {{
+      "content": {{
+        "summary": "One-sentence overview",
+        "strengths": ["Point form strengths"],
+        "weaknesses": ["Point form weaknesses"],
+        "score": 1–10
+      }},
+      "delivery": {{ ...same fields... }},
+      "grammar": {{ ...same fields... }}
+    }}
+
+    Speech:
+    \"\"\"{text}\"\"\"
+    """
+
+    return [SystemMessage(content="Return clean JSON only, no explanations."),
+            HumanMessage(content=prompt)]
+
+
+def validate_sections(data: dict) -> dict:
+    """Make sure every section has the shape the per-agent path returns."""
+    return {name: validate_section(data.get(name) if isinstance(data, dict) else None, name) for name in SECTIONS}
+
+
+async def aanalyze_combined(text: str) -> dict:
+    """
+    Single LLM call returning {"content": ..., "delivery": ..., "grammar": ...}.
+    Raises AgentOutputError when the response can't be parsed into all three sections.
+    """
+    with span("llm"):
+        response = await llm.ainvoke(build_messages(text))
+    return validate_sections(parse_agent_json(response.content))
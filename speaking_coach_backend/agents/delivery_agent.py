@@ -1,18 +1,26 @@
-import os, re, json
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain.schema import SystemMessage, HumanMessage
+from llm_client import get_llm
+from agents.parsing import parse_agent_json, AgentOutputError
+from metrics import PARSE_FAILURES
+from timing import span
 
-load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
+MODEL = "qwen/qwen3-32b"
+# Bump whenever the prompt changes so cached results are not reused
+PROMPT_VERSION = "1"
 
-llm = ChatGroq(
-    api_key=groq_api_key,
-    model="qwen/qwen3-32b",
-    temperature=0.2
-)
+llm = get_llm(MODEL, temperature=0.2)
 
-def analyze_delivery(text: str):
+
+def fallback_result():
+    return {
+        "summary": "Delivery analysis unavailable.",
+        "strengths": [],
+        "weaknesses": [],
+        "score": 0
+    }
+
+
+def build_messages(text: str):
     prompt = f"""
     You are a public speaking coach.
     Analyze the **DELIVERY** of this speech briefly and clearly.
@@ -34,19 +42,21 @@ def analyze_delivery(text: str):
     \"\"\"{text}\"\"\"
     """
 
-    response = llm.invoke([SystemMessage(content="Return only clean JSON."), HumanMessage(content=prompt)])
-    output = re.sub(r"<think>.*?</think>", "", response.content, flags=re.DOTALL)
+    return [SystemMessage(content="Return only clean JSON."),
+            HumanMessage(content=prompt)]
 
-    match = re.search(r"\{.*\}", output, re.DOTALL)
-    if match:
-        try:
-            return json.loads(match.group(0))
-        except json.JSONDecodeError:
-            pass
 
-    return {
-        "summary": "Delivery analysis unavailable.",
-        "strengths": [],
-        "weaknesses": [],
-        "score": 0
-    }
+def analyze_delivery(text: str):
+    response = llm.invoke(build_messages(text))
+    try:
+        return parse_agent_json(response.content)
+    except AgentOutputError:
+        PARSE_FAILURES.labels(agent="analyze_delivery", model=MODEL).inc()
+        return fallback_result()
+
+
+async def aanalyze_delivery(text: str):
+    """Async variant used by the orchestrator. Raises AgentOutputError on unparseable output."""
+    with span("llm"):
+        response = await llm.ainvoke(build_messages(text))
+    return parse_agent_json(response.content)
@@ -0,0 +1,130 @@
+"""
+Persistent, incrementally updated vector index for the chatbot knowledge base.
+
+Every knowledge file and every chunk is fingerprinted. Chunk ids are derived from
+their content, so on boot only new or changed chunks are embedded and chunks that no
+longer exist are deleted. An unchanged knowledge base is still read and hashed, but
+is not re-split or re-embedded. The manifest also records the embedding model, and
+a different model starts the collection over, since its vectors aren't comparable.
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+from langchain_chroma import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+KNOWLEDGE_DIR = os.getenv(
+    "CHATBOT_KNOWLEDGE_DIR",
+    os.path.join(os.path.dirname(__file__), "knowledge"),
+)
+INDEX_DIR = os.getenv("CHATBOT_INDEX_DIR", "./.chroma_chatbot")
+COLLECTION_NAME = "openspeak-chatbot"
+KNOWLEDGE_EXTENSIONS = (".txt", ".md")
+MANIFEST_NAME = "knowledge_manifest.json"
+
+CHUNK_SIZE = 900
+CHUNK_OVERLAP = 200
+EMBED_BATCH_SIZE = 64
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def knowledge_files(source: str) -> list[Path]:
+    """All knowledge files under a directory (sorted), or the single file given."""
+    path = Path(source)
+    if path.is_file():
+        return [path]
+    if not path.is_dir():
+        raise FileNotFoundError(f"❌ Knowledge base not found at {source}")
+    files = sorted(p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in KNOWLEDGE_EXTENSIONS)
+    if not files:
+        raise FileNotFoundError(f"❌ No knowledge files ({', '.join(KNOWLEDGE_EXTENSIONS)}) in {source}")
+    return files
+
+
+class KnowledgeIndex:
+    def __init__(self, embeddings, embedding_model: str, source: str = KNOWLEDGE_DIR,
+                 persist_directory: str = INDEX_DIR, collection_name: str = COLLECTION_NAME):
+        self.embedding_model = embedding_model
+        self.source = source
+        self.persist_directory = persist_directory
+        self.manifest_path = os.path.join(persist_directory, MANIFEST_NAME)
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+        self.vector_db = Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory,
+        )
+
+    # ------------------------------------------------
+    # Manifest (file fingerprints from the last sync)
+    # ------------------------------------------------
+    def _read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _write_manifest(self, manifest: dict):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+    # ------------------------------------------------
+    # Sync
+    # ------------------------------------------------
+    def _chunk(self, files: list[Path], texts: dict) -> dict:
+        """Split every file into chunks keyed by a content-derived id."""
+        chunks = {}
+        for path in files:
+            name = str(path.relative_to(self.source)) if Path(self.source).is_dir() else path.name
+            for doc in self.splitter.create_documents(
+                [texts[path]], metadatas=[{"source": name, "source_hash": fingerprint(texts[path])}]
+            ):
+                chunks[fingerprint(f"{name}\0{doc.page_content}")] = doc
+        return chunks
+
+    def sync(self) -> dict:
+        """Bring the collection in line with the knowledge files. Returns counts of what changed."""
+        files = knowledge_files(self.source)
+        texts = {path: path.read_text(encoding="utf-8") for path in files}
+        file_hashes = {str(path): fingerprint(text) for path, text in texts.items()}
+
+        manifest = self._read_manifest()
+        existing_ids = set(self.vector_db.get(include=[])["ids"])
+        reembedded = 0
+        if existing_ids and manifest.get("embedding_model") != self.embedding_model:
+            # Recreated rather than emptied: the new model may use a different dimension
+            self.vector_db.reset_collection()
+            reembedded, existing_ids = len(existing_ids), set()
+
+        if manifest.get("files") == file_hashes and manifest.get("chunk_count") == len(existing_ids):
+            return {"added": 0, "removed": 0, "unchanged": len(existing_ids)}
+
+        chunks = self._chunk(files, texts)
+        to_add = [chunk_id for chunk_id in chunks if chunk_id not in existing_ids]
+        to_remove = [chunk_id for chunk_id in existing_ids if chunk_id not in chunks]
+
+        if to_remove:
+            self.vector_db.delete(ids=to_remove)
+        for i in range(0, len(to_add), EMBED_BATCH_SIZE):
+            batch = to_add[i:i + EMBED_BATCH_SIZE]
+            self.vector_db.add_documents([chunks[chunk_id] for chunk_id in batch], ids=batch)
+
+        self._write_manifest({
+            "embedding_model": self.embedding_model,
+            "files": file_hashes,
+            "chunk_count": len(chunks),
+        })
+        return {
+            "added": len(to_add),
+            "removed": len(to_remove) + reembedded,
+            "unchanged": len(chunks) - len(to_add),
+        }
+
+    def as_retriever(self, **kwargs):
+        return self.vector_db.as_retriever(**kwargs)
@@ -0,0 +1,45 @@
+import re
+import json
+
+
+class AgentOutputError(ValueError):
+    """Raised when an agent's LLM response does not contain usable JSON."""
+
+
+def parse_agent_json(output: str) -> dict:
+    """
+    Strip <think> blocks from a model response and decode the first JSON object.
+    Raises AgentOutputError when no valid JSON object is found.
+    """
+    output = re.sub(r"<think>.*?</think>", "", output or "", flags=re.DOTALL)
+
+    match = re.search(r"\{.*\}", output, re.DOTALL)
+    if not match:
+        raise AgentOutputError("No JSON object found in model response.")
+
+    try:
+        return json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise AgentOutputError(f"Invalid JSON in model response: {e}") from e
+
+
+def _points(value) -> list[str]:
+    if isinstance(value, str):
+        return [value]
+    return [str(point) for point in value] if isinstance(value, list) else []
+
+
+def validate_section(section, name: str) -> dict:
+    """
+    Normalize one feedback section to {"summary", "strengths", "weaknesses", "score"}.
+    Raises AgentOutputError when it isn't an object with a numeric score.
+    """
+    score = section.get("score") if isinstance(section, dict) else None
+    if not isinstance(score, (int, float)) or isinstance(score, bool):
+        raise AgentOutputError(f"Response is missing a valid '{name}' section.")
+    return {
+        "summary": str(section.get("summary") or ""),
+        "strengths": _points(section.get("strengths")),
+        "weaknesses": _points(section.get("weaknesses")),
+        "score": score,
+    }
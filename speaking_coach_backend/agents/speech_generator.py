@@ -1,15 +1,13 @@
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.runnables import RunnableWithMessageHistory
-from langchain_groq import ChatGroq
-import os
+from session_store import SessionStore, summarize_with
+from llm_client import get_llm
 from dotenv import load_dotenv
 import re
 
 # 🌍 Load environment variables
 load_dotenv()
-groq_api_key = os.getenv("GROQ_API_KEY")
 
 def estimate_word_count(user_input: str) -> int:
     """
@@ -22,18 +20,14 @@ def estimate_word_count(user_input: str) -> int:
         return minutes * 130  # convert time to word count
     return 300  # default if not specified
 
-def create_speech_generator():
+def create_speech_generator(session_store: SessionStore | None = None):
     """
     Creates a conversational AI chain that generates motivational and structured public speaking scripts.
     Uses STAR (Situation, Task, Action, Result) + speechwriting techniques.
     """
 
     # 🧩 Initialize Groq LLM
-    llm = ChatGroq(
-        groq_api_key=groq_api_key,
-        model="llama-3.1-8b-instant",
-        temperature=0.8  # adds creativity but keeps coherence
-    )
+    llm = get_llm("llama-3.1-8b-instant", temperature=0.8)  # adds creativity but keeps coherence
 
     # 🧠 Professional System Prompt
     system_prompt = (
@@ -76,14 +70,15 @@ def create_speech_generator():
     # 🔗 Build Chain
     chain = prompt | llm
 
-    # 🧱 In-memory chat session store
-    session_store = {}
+    # 🧱 In-memory chat session store (bounded, older turns summarized)
+    if session_store is None:
+        session_store = SessionStore()
+    if session_store.summarize is None:
+        session_store.summarize = summarize_with(llm)
 
     def get_session_history(session_id: str) -> BaseChatMessageHistory:
         """Retrieve or initialize chat session history."""
-        if session_id not in session_store:
-            session_store[session_id] = ChatMessageHistory()
-        return session_store[session_id]
+        return session_store.get_history(session_id)
 
     # 🗣 Wrap chain with persistent message history
     speech_chain = RunnableWithMessageHistory(
@@ -0,0 +1,193 @@
+"""
+Content-addressed cache for agent analysis results.
+
+Keys are a SHA-256 of the normalized transcript, the agent name, the model and
+the agent's prompt version, so a prompt or model change never serves stale results.
+Lookups go through an in-process LRU tier first, then the analysis_cache table.
+"""
+import os
+import copy
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from sqlalchemy import select, delete, func
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+CACHE_DB_ENABLED = os.getenv("ANALYSIS_CACHE_DB_ENABLED", "true").lower() == "true"
+CACHE_TTL = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MEMORY_SIZE = int(os.getenv("ANALYSIS_CACHE_MEMORY_SIZE", "512"))
+CACHE_DB_MAX_ROWS = int(os.getenv("ANALYSIS_CACHE_DB_MAX_ROWS", "10000"))
+# Run expiry/size pruning on the table once every N writes
+CACHE_DB_PRUNE_EVERY = int(os.getenv("ANALYSIS_CACHE_DB_PRUNE_EVERY", "100"))
+
+
+def normalize_transcript(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivial re-posts hash the same."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def make_key(transcript: str, agent: str, model: str, prompt_version: str) -> str:
+    digest = hashlib.sha256()
+    for part in (agent, model, prompt_version, normalize_transcript(transcript)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, enabled=CACHE_ENABLED, db_enabled=CACHE_DB_ENABLED, ttl=CACHE_TTL,
+                 memory_size=CACHE_MEMORY_SIZE, db_max_rows=CACHE_DB_MAX_ROWS):
+        self.enabled = enabled
+        self.db_enabled = db_enabled
+        self.ttl = ttl
+        self.db_max_rows = db_max_rows
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self._session_factory = None
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            "memory_hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "db_errors": 0,
+            "llm_seconds_saved": 0.0,
+        }
+
+    # ------------------------------------------------
+    # Persistent tier
+    # ------------------------------------------------
+    def _sessions(self):
+        if self._session_factory is None:
+            from database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory
+
+    def _db_get(self, key: str):
+        from models import AnalysisCacheEntry
+        with self._sessions()() as db:
+            row = db.get(AnalysisCacheEntry, key)
+            if row is None:
+                return None
+            if row.expires_at is not None and row.expires_at <= time.time():
+                db.delete(row)
+                db.commit()
+                return None
+            row.hits += 1
+            db.commit()
+            return json.loads(row.result), row.elapsed_ms or 0.0
+
+    def _db_set(self, key: str, agent: str, model: str, result: dict, elapsed_ms: float):
+        from models import AnalysisCacheEntry
+        with self._sessions()() as db:
+            db.merge(AnalysisCacheEntry(
+                key=key,
+                agent=agent,
+                model=model,
+                result=json.dumps(result, ensure_ascii=False),
+                elapsed_ms=elapsed_ms,
+                hits=0,
+                expires_at=time.time() + self.ttl if self.ttl else None,
+            ))
+            db.commit()
+
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % CACHE_DB_PRUNE_EVERY == 0
+            if prune:
+                self._db_prune(db)
+
+    def _db_prune(self, db):
+        """Drop expired rows, then the soonest-to-expire rows above db_max_rows."""
+        from models import AnalysisCacheEntry
+        db.execute(delete(AnalysisCacheEntry).where(AnalysisCacheEntry.expires_at <= time.time()))
+        excess = db.scalar(select(func.count()).select_from(AnalysisCacheEntry)) - self.db_max_rows
+        if excess > 0:
+            oldest = select(AnalysisCacheEntry.key).order_by(AnalysisCacheEntry.expires_at.asc()).limit(excess)
+            db.execute(delete(AnalysisCacheEntry).where(AnalysisCacheEntry.key.in_(oldest)))
+        db.commit()
+
+    # ------------------------------------------------
+    # Public API
+    # ------------------------------------------------
+    def _count(self, name: str, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def get(self, key: str):
+        """Return the cached result for key, or None."""
+        if not self.enabled:
+            return None
+
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._count("memory_hits")
+            self._count("llm_seconds_saved", entry[1] / 1000)
+            return copy.deepcopy(entry[0])
+
+        if self.db_enabled:
+            try:
+                entry = self._db_get(key)
+            except Exception as e:
+                self._count("db_errors")
+                logger.warning("analysis cache lookup failed: %s", e)
+                entry = None
+            if entry is not None:
+                self.memory.set(key, entry)
+                self._count("db_hits")
+                self._count("llm_seconds_saved", entry[1] / 1000)
+                return copy.deepcopy(entry[0])
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, agent: str, model: str, result: dict, elapsed_ms: float = 0.0):
+        if not self.enabled:
+            return
+        self.memory.set(key, (copy.deepcopy(result), elapsed_ms))
+        self._count("stores")
+        if self.db_enabled:
+            try:
+                self._db_set(key, agent, model, result, elapsed_ms)
+            except Exception as e:
+                self._count("db_errors")
+                logger.warning("analysis cache write failed: %s", e)
+
+    async def aget(self, key: str):
+        if not self.enabled:
+            return None
+        if not self.db_enabled or key in self.memory:
+            # Memory-only lookups never touch I/O, so skip the thread hop
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, agent: str, model: str, result: dict, elapsed_ms: float = 0.0):
+        if self.enabled and self.db_enabled:
+            await asyncio.to_thread(self.set, key, agent, model, result, elapsed_ms)
+        else:
+            self.set(key, agent, model, result, elapsed_ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["db_hits"]
+        return {
+            **counters,
+            "llm_seconds_saved": round(counters["llm_seconds_saved"], 2),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "enabled": self.enabled,
+            "db_enabled": self.db_enabled,
+        }
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,150 @@
+"""
+ffmpeg preprocessing for Whisper transcription.
+
+prepare_audio decodes the upload once, resamples it to 16 kHz mono in a compact
+codec (~240 KB per minute at 32 kbit/s instead of the browser's ~1 MB WebM) and runs
+silence detection in the same pass. Recordings longer than SEGMENT_MAX_SECONDS are then
+cut, without re-encoding, at the silence closest to every SEGMENT_TARGET_SECONDS
+mark, so each segment can be transcribed concurrently and no word is split.
+"""
+import os
+import re
+import shutil
+import asyncio
+from dataclasses import dataclass
+
+FFMPEG = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_CODEC = os.getenv("AUDIO_CODEC", "mp3")
+AUDIO_BITRATE = os.getenv("AUDIO_BITRATE", "32k")
+SEGMENT_TARGET_SECONDS = float(os.getenv("SEGMENT_TARGET_SECONDS", "120"))
+SEGMENT_MAX_SECONDS = float(os.getenv("SEGMENT_MAX_SECONDS", "180"))
+SILENCE_NOISE = os.getenv("SILENCE_NOISE", "-35dB")
+SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", "0.4"))
+
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+PROGRESS_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+SILENCE_RE = re.compile(r"silence_(start|end): (-?\d+(?:\.\d+)?)")
+
+# codec -> (file extension, encoder arguments). MP3 encodes several times faster than
+# Opus for a slightly larger file; both are accepted by Whisper.
+CODECS = {
+    "mp3": (".mp3", ["-c:a", "libmp3lame", "-b:a", AUDIO_BITRATE]),
+    "opus": (".ogg", ["-c:a", "libopus", "-b:a", AUDIO_BITRATE, "-application", "voip", "-compression_level", "0"]),
+}
+
+
+class AudioProcessingError(Exception):
+    """ffmpeg could not decode or split the audio."""
+
+
+@dataclass
+class AudioSegment:
+    path: str
+    start: float  # offset of this segment in the original recording (seconds)
+    end: float
+
+
+@dataclass
+class PreparedAudio:
+    duration: float | None
+    segments: list[AudioSegment]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(os.path.getsize(s.path) for s in self.segments)
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG) is not None
+
+
+async def _ffmpeg(*args: str) -> str:
+    """Run ffmpeg and return its log (stderr). Raises AudioProcessingError on failure."""
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG, "-hide_banner", "-nostdin", "-y", *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    log = stderr.decode(errors="replace")
+    if process.returncode != 0:
+        raise AudioProcessingError(log.strip().splitlines()[-1] if log.strip() else "ffmpeg failed")
+    return log
+
+
+def _seconds(match) -> float:
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def parse_duration(log: str) -> float | None:
+    """Container duration, or the last progress timestamp (browser WebM often has no duration header)."""
+    progress = PROGRESS_TIME_RE.findall(log)
+    if progress:
+        hours, minutes, seconds = progress[-1]
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = DURATION_RE.search(log)
+    return _seconds(match) if match else None
+
+
+def parse_silences(log: str, duration: float | None = None) -> list[tuple[float, float]]:
+    silences, start = [], None
+    for kind, value in SILENCE_RE.findall(log):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            silences.append((start, float(value)))
+            start = None
+    if start is not None and duration:
+        silences.append((start, duration))  # trailing silence
+    return silences
+
+
+def plan_segments(duration: float, silences: list[tuple[float, float]],
+                  target: float = SEGMENT_TARGET_SECONDS, max_len: float = SEGMENT_MAX_SECONDS) -> list[float]:
+    """
+    Cut points (seconds) so no segment exceeds max_len. Each cut is the silence midpoint
+    nearest to `target` seconds after the previous cut, or a hard cut at `target` if there is none.
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts, start = [], 0.0
+    while duration - start > max_len:
+        aim = start + target
+        candidates = [m for m in midpoints if start + target / 2 < m <= start + max_len]
+        cut = min(candidates, key=lambda m: abs(m - aim)) if candidates else aim
+        cuts.append(cut)
+        start = cut
+    return cuts
+
+
+async def prepare_audio(path: str, workdir: str) -> PreparedAudio:
+    """Transcode to 16 kHz mono AUDIO_CODEC (detecting silences in the same pass) and split long recordings."""
+    extension, encoder = CODECS[AUDIO_CODEC]
+    prepared = os.path.join(workdir, f"prepared{extension}")
+    log = await _ffmpeg(
+        "-i", path, "-vn",
+        "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+        "-af", f"silencedetect=noise={SILENCE_NOISE}:d={SILENCE_MIN_SECONDS}",
+        *encoder,
+        prepared,
+    )
+    duration = parse_duration(log)
+    cuts = plan_segments(duration, parse_silences(log, duration)) if duration else []
+    if not cuts:
+        return PreparedAudio(duration, [AudioSegment(prepared, 0.0, duration or 0.0)])
+
+    pattern = os.path.join(workdir, f"segment_%03d{extension}")
+    await _ffmpeg(
+        "-i", prepared, "-c", "copy",
+        "-f", "segment", "-segment_times", ",".join(f"{c:.3f}" for c in cuts), "-reset_timestamps", "1",
+        pattern,
+    )
+    bounds = [0.0, *cuts, duration]
+    segments = [
+        AudioSegment(pattern % i, bounds[i], bounds[i + 1])
+        for i in range(len(bounds) - 1)
+        if os.path.exists(pattern % i)
+    ]
+    os.remove(prepared)
+    return PreparedAudio(duration, segments)
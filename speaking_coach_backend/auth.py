@@ -1,16 +1,21 @@
 # auth.py
 from datetime import datetime, timedelta
+from dataclasses import dataclass
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, AsyncSessionLocal
+from ttl_cache import TTLCache
+import crud
 import os
 
 # Config from .env
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecret")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 300))
 
 # OAuth2 scheme: expects "Authorization: Bearer <token>"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -37,23 +42,71 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    """
-    Decode JWT and return the email (sub claim).
-    """
+def decode_token(token: str) -> dict:
+    """Decode and validate a JWT. Raises 401 when invalid, expired or missing a subject."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: no subject",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return email
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: no subject",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)):
+    """
+    Decode JWT and return the email (sub claim).
+    """
+    return decode_token(token)["sub"]
+
+
+# ---------------------------
+# Resolved user (cached)
+# ---------------------------
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    username: str
+    email: str
+
+
+# user id -> CurrentUser; invalidated on profile changes
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def _load_user(db: Session, user_id: int = None, email: str = None):
+    user = crud.get_user_by_id(db, user_id) if user_id is not None else crud.get_user_by_email(db, email)
+    if user is None:
+        return None
+    return CurrentUser(id=user.id, username=user.username, email=user.email)
+
+
+def invalidate_user(user_id: int):
+    """Drop a user from the identity cache (call after any profile change)."""
+    user_cache.pop(user_id)
+
+
+async def get_current_db_user(token: str = Depends(oauth2_scheme)) -> CurrentUser:
+    """
+    Resolve the token to a user without touching the database on the hot path.
+    Tokens carry the user id ("uid"); tokens issued before that fall back to an email lookup.
+    """
+    payload = decode_token(token)
+    user_id = payload.get("uid")
+
+    user = user_cache.get(user_id) if user_id is not None else None
+    if user is None:
+        async with AsyncSessionLocal() as db:
+            user = await db.run_sync(_load_user, user_id, None if user_id is not None else payload["sub"])
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        user_cache.set(user.id, user)
+    return user
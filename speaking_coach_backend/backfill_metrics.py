@@ -0,0 +1,22 @@
+"""
+Compute local speech metrics (speech_metrics.py) for feedback rows saved before
+the metrics column existed. Words per minute stays empty: older rows have no audio duration.
+
+    python backfill_metrics.py
+    python backfill_metrics.py --batch-size 2000
+"""
+import argparse
+import crud, models
+from database import SessionLocal, engine
+from migrate import run_migrations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill feedback.metrics from stored transcripts.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with SessionLocal() as db:
+        updated = crud.backfill_metrics(db, batch_size=args.batch_size)
+    print(f"✅ Speech metrics backfilled for {updated} feedback rows")
@@ -0,0 +1,61 @@
+"""
+Compare the "parallel" and "combined" analysis modes on tokens and latency.
+
+Makes live Groq calls (GROQ_API_KEY must be set). The analysis cache is switched off,
+so every run reaches the LLM instead of repeating the first run's result from cache.
+Run from speaking_coach_backend/:
+
+    python -m benchmarks.bench_analysis_modes --runs 3
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from langchain_core.callbacks import get_usage_metadata_callback
+from orchestrator import orchestrate_analysis_async
+from analysis_cache import analysis_cache
+
+SHORT_SPEECH = """
+Good morning everyone. Today I want to talk about the importance of daily exercise.
+Just 20 minutes of walking can improve both physical and mental health.
+I encourage you to make exercise a part of your daily routine.
+"""
+
+# ~5 minutes of speech
+LONG_SPEECH = " ".join([SHORT_SPEECH.strip()] * 25)
+
+
+async def measure(transcript: str, mode: str) -> dict:
+    with get_usage_metadata_callback() as cb:
+        start = time.perf_counter()
+        await orchestrate_analysis_async(transcript, mode)
+        elapsed = time.perf_counter() - start
+
+    usage = cb.usage_metadata
+    return {
+        "latency": elapsed,
+        "input_tokens": sum(u.get("input_tokens", 0) for u in usage.values()),
+        "output_tokens": sum(u.get("output_tokens", 0) for u in usage.values()),
+    }
+
+
+async def main(runs: int):
+    analysis_cache.enabled = False
+    for label, transcript in (("short", SHORT_SPEECH), ("long", LONG_SPEECH)):
+        print(f"\n===== {label} transcript ({len(transcript.split())} words) =====")
+        print(f"{'mode':<10}{'latency p50 (s)':>18}{'input tok':>12}{'output tok':>12}")
+        for mode in ("parallel", "combined"):
+            samples = [await measure(transcript, mode) for _ in range(runs)]
+            print(
+                f"{mode:<10}"
+                f"{statistics.median(s['latency'] for s in samples):>18.2f}"
+                f"{statistics.mean(s['input_tokens'] for s in samples):>12.0f}"
+                f"{statistics.mean(s['output_tokens'] for s in samples):>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="runs per mode and transcript")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs))
@@ -0,0 +1,76 @@
+"""
+Compare per-request identity resolution on protected routes:
+  before: decode JWT, then crud.get_user_by_email on every request
+  after:  auth.get_current_db_user (user id in the token + TTL cache)
+
+Uses a throwaway SQLite database unless --database-url is given (a real Postgres
+URL shows the network round trip the cache avoids). Run from speaking_coach_backend/:
+
+    python -m benchmarks.bench_auth --requests 5000
+"""
+import os
+import asyncio
+import argparse
+import tempfile
+import statistics
+import time
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def report(label, samples):
+    print(
+        f"{label:<34}"
+        f"{statistics.mean(samples) * 1e6:>10.1f}"
+        f"{percentile(samples, 50) * 1e6:>10.1f}"
+        f"{percentile(samples, 95) * 1e6:>10.1f}"
+    )
+
+
+async def main(requests: int):
+    # Imported here so DATABASE_URL is set first
+    import crud, models
+    from database import SessionLocal, engine
+    from auth import create_access_token, get_current_user, get_current_db_user
+
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = crud.get_user_by_email(db, "bench@example.com") or crud.create_user(
+            db, "bench", "bench@example.com", "bench-password"
+        )
+        token = create_access_token(data={"sub": user.email, "uid": user.id})
+
+    before = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        email = get_current_user(token)
+        with SessionLocal() as db:
+            crud.get_user_by_email(db, email)
+        before.append(time.perf_counter() - start)
+
+    after = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await get_current_db_user(token)
+        after.append(time.perf_counter() - start)
+
+    print(f"{'identity resolution':<34}{'mean µs':>10}{'p50 µs':>10}{'p95 µs':>10}")
+    report("before: JWT + users query", before)
+    report("after: JWT + cached user", after)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_auth.db')}"
+
+    asyncio.run(main(args.requests))
@@ -0,0 +1,118 @@
+"""
+Compare the two database paths a request handler can take under concurrency:
+  sync:  SessionLocal inside run_in_threadpool (the old route code)
+  async: AsyncSessionLocal + AsyncSession.run_sync (current route code)
+
+Each simulated request loads one /history page. A ticker task measures event-loop
+lag while the load runs, which is what other in-flight requests feel. Uses a
+throwaway SQLite database unless --database-url is given. Run from speaking_coach_backend/:
+
+    python -m benchmarks.bench_db --requests 2000 --concurrency 50
+"""
+import os
+import asyncio
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from benchmarks.bench_auth import percentile
+
+
+async def measure_lag(stop: asyncio.Event, interval: float = 0.005) -> list[float]:
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return lags
+
+
+async def run_load(request, requests: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lags = await ticker
+    return latencies, elapsed, lags
+
+
+def report(label, latencies, elapsed, lags):
+    print(
+        f"{label:<8}"
+        f"{len(latencies) / elapsed:>12.0f}"
+        f"{percentile(latencies, 50) * 1e3:>10.2f}"
+        f"{percentile(latencies, 95) * 1e3:>10.2f}"
+        f"{percentile(latencies, 99) * 1e3:>10.2f}"
+        f"{max(lags, default=0) * 1e3:>12.2f}"
+    )
+
+
+async def main(requests: int, concurrency: int, speeches: int):
+    # Imported here so DATABASE_URL is set first
+    import crud, models
+    from starlette.concurrency import run_in_threadpool
+    from database import SessionLocal, AsyncSessionLocal, async_engine, engine
+
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = crud.get_user_by_email(db, "bench-db@example.com") or crud.create_user(
+            db, "bench-db", "bench-db@example.com", password_hash="x"
+        )
+        user_id = user.id
+        start = datetime.now(timezone.utc) - timedelta(days=speeches)
+        crud.bulk_import_speeches(db, user_id, [
+            {
+                "transcript": f"Benchmark speech {i}",
+                "feedback": {"overall": {"score": 7}, "suggestions": ["Slow down"]},
+                "created_at": start + timedelta(days=i),
+            }
+            for i in range(speeches)
+        ])
+
+    def sync_page():
+        with SessionLocal() as db:
+            return crud.get_user_speeches(db, user_id, limit=50)
+
+    async def sync_request():
+        await run_in_threadpool(sync_page)
+
+    async def async_request():
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(crud.get_user_speeches, user_id, limit=50)
+
+    # Warm both pools before timing
+    await sync_request()
+    await async_request()
+
+    print(f"{requests} requests, concurrency {concurrency}, {speeches} speeches")
+    print(f"{'path':<8}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max lag ms':>12}")
+    report("sync", *await run_load(sync_request, requests, concurrency))
+    report("async", *await run_load(async_request, requests, concurrency))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--speeches", type=int, default=500)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_db.db')}"
+
+    asyncio.run(main(args.requests, args.concurrency, args.speeches))
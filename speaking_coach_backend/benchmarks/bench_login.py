@@ -0,0 +1,71 @@
+"""
+Login-spike benchmark: bcrypt verification inline in the threadpool (old behaviour)
+vs. on the dedicated process pool from password_hashing.py.
+
+For each strategy, --logins verifications are fired at once while a probe
+measures how long a trivial threadpool task (standing in for an analysis
+request's DB work) waits behind them. Run from speaking_coach_backend/:
+
+    python -m benchmarks.bench_login --logins 200 --rounds 12
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import bcrypt
+import password_hashing
+
+
+def inline_check(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+async def probe(stop: asyncio.Event, waits: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.to_thread(lambda: None)
+        waits.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def run(label: str, verify, logins: int, password: str, hashed: str):
+    stop, waits = asyncio.Event(), []
+    probe_task = asyncio.create_task(probe(stop, waits))
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(verify(password, hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe_task
+    assert all(results)
+
+    waits.sort()
+    p95 = waits[int(len(waits) * 0.95)] if waits else 0.0
+    print(
+        f"{label:<26}{logins / elapsed:>12.1f}{elapsed:>10.2f}"
+        f"{statistics.median(waits) * 1000 if waits else 0:>14.1f}{p95 * 1000:>14.1f}"
+    )
+
+
+async def main(logins: int, rounds: int):
+    password = "correct horse battery staple"
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+    print(f"bcrypt cost {rounds}, {logins} concurrent logins, {password_hashing.BCRYPT_WORKERS} pool workers")
+    print(f"{'strategy':<26}{'logins/s':>12}{'total s':>10}{'probe p50 ms':>14}{'probe p95 ms':>14}")
+
+    await run("inline (threadpool)", lambda p, h: asyncio.to_thread(inline_check, p, h), logins, password, hashed)
+
+    password_hashing.get_pool()  # start workers outside the timed section
+    await password_hashing.acheck_password(password, hashed)
+    await run("process pool", password_hashing.acheck_password, logins, password, hashed)
+    password_hashing.shutdown_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=password_hashing.BCRYPT_ROUNDS)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.rounds))
@@ -0,0 +1,105 @@
+"""
+Bytes uploaded and end-to-end transcription time for a long recording:
+  raw:          the browser-style WebM sent to Whisper in one request
+  preprocessed: 16 kHz mono MP3/Opus, split at silences, segments transcribed concurrently
+
+Whisper is replaced by a local stand-in whose latency is modeled as
+    request overhead + upload time (bytes / bandwidth) + audio seconds * real-time factor
+so the numbers are reproducible without a GROQ_API_KEY. Needs ffmpeg on PATH, which
+also synthesizes the test recording (tone bursts separated by pauses). Run from speaking_coach_backend/:
+
+    python -m benchmarks.bench_transcription --minutes 15
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark")  # the Groq client is never called
+
+
+class FakeWhisper:
+    """Stand-in transcription service with a simple latency model."""
+
+    def __init__(self, upload_mbps: float, realtime_factor: float, overhead: float):
+        self.upload_mbps = upload_mbps
+        self.realtime_factor = realtime_factor
+        self.overhead = overhead
+        self.requests = 0
+        self.bytes = 0
+
+    async def __call__(self, path: str) -> dict:
+        from audio_processing import _ffmpeg, parse_duration
+
+        start = time.perf_counter()
+        size = os.path.getsize(path)
+        seconds = parse_duration(await _ffmpeg("-i", path, "-f", "null", "-")) or 0.0
+        modeled = self.overhead + size * 8 / (self.upload_mbps * 1e6) + seconds * self.realtime_factor
+        # Don't bill the stand-in's own duration probe to the pipeline
+        await asyncio.sleep(max(0.0, modeled - (time.perf_counter() - start)))
+
+        self.requests += 1
+        self.bytes += size
+        words = [{"word": f"w{i}", "start": i * 0.4, "end": i * 0.4 + 0.3} for i in range(int(seconds / 0.4))]
+        return {
+            "text": " ".join(w["word"] for w in words),
+            "duration": seconds,
+            "words": words,
+            "segments": [{"start": 0.0, "end": seconds, "text": ""}],
+        }
+
+
+def synthesize(path: str, minutes: float):
+    """8-second cycles: 6.8 s of tone, 1.2 s of silence; stereo 48 kHz Opus WebM like MediaRecorder output."""
+    expression = "0.3*sin(2*PI*220*t)*gt(mod(t\\,8)\\,1.2)"
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+         "-f", "lavfi", "-i", f"aevalsrc={expression}:s=48000:c=stereo:d={minutes * 60}",
+         "-c:a", "libopus", "-b:a", "128k", path],
+        check=True,
+    )
+
+
+async def run(label: str, path: str, preprocess: bool, fake: FakeWhisper):
+    import transcription
+
+    transcription.AUDIO_PREPROCESSING = preprocess
+    fake.requests = fake.bytes = 0
+    start = time.perf_counter()
+    result = await transcription.transcribe_audio(path)
+    elapsed = time.perf_counter() - start
+    last_word = result["words"][-1]["end"] if result["words"] else 0.0
+    print(
+        f"{label:<14}{result['bytes_uploaded'] / 1e6:>10.2f}{fake.requests:>10}"
+        f"{elapsed:>10.2f}{last_word:>14.1f}"
+    )
+
+
+async def main(args):
+    import transcription
+    from audio_processing import ffmpeg_available
+
+    if not ffmpeg_available():
+        raise SystemExit("ffmpeg is required for this benchmark")
+
+    fake = FakeWhisper(args.upload_mbps, args.realtime_factor, args.overhead)
+    transcription.set_transcriber(fake)
+
+    path = os.path.join(tempfile.mkdtemp(), "recording.webm")
+    synthesize(path, args.minutes)
+    print(f"{args.minutes:g}-minute recording, {os.path.getsize(path) / 1e6:.2f} MB; "
+          f"stand-in: {args.upload_mbps:g} Mbit/s upload, RTF {args.realtime_factor:g}, {args.overhead:g}s overhead")
+    print(f"{'path':<14}{'MB sent':>10}{'requests':>10}{'seconds':>10}{'last word @s':>14}")
+    await run("raw", path, False, fake)
+    await run("preprocessed", path, True, fake)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=15)
+    parser.add_argument("--upload-mbps", type=float, default=10)
+    parser.add_argument("--realtime-factor", type=float, default=0.01)
+    parser.add_argument("--overhead", type=float, default=0.3)
+    asyncio.run(main(parser.parse_args()))
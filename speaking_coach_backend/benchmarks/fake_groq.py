@@ -0,0 +1,213 @@
+"""
+Local stand-in for the Groq API (chat completions and Whisper transcriptions).
+
+The app and the Groq SDK talk to it unchanged. Start it and point GROQ_BASE_URL
+at it, and every ChatGroq / AsyncGroq client in the app calls the fake instead.
+The app's own rate limiter, retries and circuit breaker stay in the loop.
+Latency model:
+    chat:          latency + U(0, jitter) + completion_tokens / tokens_per_second
+    transcription: whisper_overhead + bytes / upload bandwidth + audio seconds * realtime_factor
+A fraction of requests (error_rate) is answered with 429 and a Retry-After header.
+
+Agent prompts (any message mentioning JSON) get a JSON answer that satisfies both
+the per-agent and the combined schema; everything else gets plain text. Run from
+speaking_coach_backend/:
+
+    python -m benchmarks.fake_groq --port 8765 --latency 0.8 --jitter 0.4 --error-rate 0.02
+    GROQ_BASE_URL=http://127.0.0.1:8765 uvicorn server:app
+"""
+import io
+import json
+import time
+import wave
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, asdict
+from fastapi import FastAPI, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "practice clear structure helps every speaker connect with the audience through "
+    "stories pauses and confident delivery"
+).split()
+
+
+@dataclass
+class FakeGroqConfig:
+    latency: float = 0.8  # seconds before the first token
+    jitter: float = 0.4  # extra uniform delay, seconds
+    tokens_per_second: float = 400.0  # completion token rate (0 = instant)
+    completion_tokens: int = 250
+    error_rate: float = 0.0  # probability of a 429
+    retry_after: float = 1.0  # Retry-After sent with injected 429s, seconds
+    whisper_overhead: float = 0.3
+    upload_mbps: float = 10.0
+    realtime_factor: float = 0.01  # transcription seconds per audio second
+    audio_kbps: float = 32.0  # bitrate assumed for non-WAV uploads when estimating duration
+    seed: int | None = None
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def audio_seconds(data: bytes, kbps: float) -> float:
+    """Exact duration for WAV uploads; other formats are estimated from their size at `kbps`."""
+    try:
+        with wave.open(io.BytesIO(data)) as f:
+            return f.getnframes() / f.getframerate()
+    except (wave.Error, EOFError):
+        return len(data) * 8 / (kbps * 1000)
+
+
+def section(rng: random.Random) -> dict:
+    return {
+        "summary": "Clear message with a logical flow.",
+        "strengths": ["Strong opening", "Relevant examples"],
+        "weaknesses": ["Rushed conclusion", "Few pauses"],
+        "score": rng.randint(5, 9),
+    }
+
+
+def create_app(config: FakeGroqConfig) -> FastAPI:
+    app = FastAPI(title="Fake Groq")
+    rng = random.Random(config.seed)
+    stats = {"chat": 0, "transcriptions": 0, "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def rate_limited():
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached (injected)", "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": str(config.retry_after)},
+            )
+        return None
+
+    def first_token_delay() -> float:
+        return config.latency + rng.uniform(0, config.jitter)
+
+    def completion_text(messages: list[dict], tokens: int) -> str:
+        if any("JSON" in str(m.get("content", "")) for m in messages):
+            return json.dumps({
+                **section(rng),
+                "content": section(rng),
+                "delivery": section(rng),
+                "grammar": section(rng),
+            })
+        words = max(1, tokens * 3 // 4)
+        return " ".join(WORDS[i % len(WORDS)] for i in range(words)) + "."
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["chat"] += 1
+        if (error := rate_limited()) is not None:
+            return error
+
+        messages = body.get("messages", [])
+        model = body.get("model", "fake")
+        content = completion_text(messages, config.completion_tokens)
+        prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        generation = completion_tokens / config.tokens_per_second if config.tokens_per_second else 0.0
+        completion_id = f"chatcmpl-fake-{stats['chat']}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token_delay() + generation)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                    "logprobs": None,
+                }],
+                "usage": usage,
+            }
+
+        async def events():
+            await asyncio.sleep(first_token_delay())
+            pieces = content.split(" ")
+            per_piece = generation / len(pieces)
+            for i, piece in enumerate(pieces):
+                delta = {"content": piece if i == 0 else " " + piece}
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                         "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(per_piece)
+            last = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+            yield f"data: {json.dumps(last)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def transcriptions(file: UploadFile = File(...), model: str = Form("whisper-large-v3")):
+        data = await file.read()
+        stats["transcriptions"] += 1
+        if (error := rate_limited()) is not None:
+            return error
+
+        seconds = audio_seconds(data, config.audio_kbps)
+        await asyncio.sleep(
+            config.whisper_overhead
+            + len(data) * 8 / (config.upload_mbps * 1e6)
+            + seconds * config.realtime_factor
+        )
+        # ~2.5 words per second of audio
+        words = [
+            {"word": WORDS[i % len(WORDS)], "start": round(i * 0.4, 2), "end": round(i * 0.4 + 0.3, 2)}
+            for i in range(int(seconds / 0.4))
+        ]
+        text = " ".join(w["word"] for w in words)
+        return {
+            "task": "transcribe",
+            "language": "english",
+            "duration": seconds,
+            "text": text,
+            "words": words,
+            "segments": [{"id": 0, "start": 0.0, "end": seconds, "text": text}],
+        }
+
+    @app.get("/stats")
+    def get_stats():
+        return {**stats, "config": asdict(config)}
+
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Fake Groq options, shared with the load test so it can forward them."""
+    defaults = FakeGroqConfig()
+    for name, value in asdict(defaults).items():
+        kind = int if name == "seed" else type(value)
+        parser.add_argument(f"--{name.replace('_', '-')}", type=kind, default=value)
+
+
+def config_from_args(args) -> FakeGroqConfig:
+    return FakeGroqConfig(**{name: getattr(args, name) for name in asdict(FakeGroqConfig())})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
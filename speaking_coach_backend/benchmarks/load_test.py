@@ -0,0 +1,331 @@
+"""
+Offline load test: the real app on SQLite against a fake Groq (benchmarks/fake_groq.py).
+
+Starts the fake Groq in a subprocess and points GROQ_BASE_URL at it. Requests go to
+server.app in-process through httpx's ASGI transport, with the app lifespan running.
+Each scenario runs --requests times at --concurrency and reports p50/p95/p99 latency
+and throughput:
+    orchestrate      orchestrate_analysis_async (what orchestrate_analysis runs)
+    analyze          POST /analyze
+    analyze_audio    POST /analyze_audio (a synthesized WAV of --audio-seconds)
+    history          GET /history (the user is seeded with --seed-speeches speeches)
+    chat             POST /chat (fake embeddings, throwaway vector index)
+    generate_speech  POST /generate-speech
+Transcripts differ per request so the analysis cache doesn't hide the LLM path
+(--same-transcript to measure cache hits). The client-side LLM rate limiter is off
+unless LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE are exported.
+
+Results are written to --output as JSON. With --baseline, they are compared to an earlier run
+and the exit status is 1 when p95 or throughput regressed by more than --threshold percent.
+Run from speaking_coach_backend/:
+
+    python -m benchmarks.load_test --requests 100 --concurrency 16 --label main
+    python -m benchmarks.load_test --baseline benchmarks/results/main.json --error-rate 0.05
+"""
+import os
+import sys
+import json
+import math
+import time
+import wave
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from dataclasses import asdict
+from benchmarks.bench_auth import percentile
+from benchmarks import fake_groq
+
+SCENARIOS = ("orchestrate", "analyze", "analyze_audio", "history", "chat", "generate_speech")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+SPEECH = (
+    "Good morning everyone. Today I want to talk about the importance of daily exercise. "
+    "Just 20 minutes of walking can improve both physical and mental health. "
+    "Um, I encourage you to make exercise a part of your daily routine, you know, starting today."
+)
+
+
+def transcript(i: int, same: bool) -> str:
+    return SPEECH if same else f"{SPEECH} This is rehearsal number {i}."
+
+
+# ------------------------------------------------
+# 🧪 Setup
+# ------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_groq(args, port: int) -> subprocess.Popen:
+    forwarded = []
+    for name, value in asdict(fake_groq.config_from_args(args)).items():
+        if value is not None:
+            forwarded += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_groq", "--port", str(port), *forwarded],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise SystemExit("fake Groq exited during startup")
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("fake Groq did not start")
+
+
+def configure_environment(fake_url: str, workdir: str):
+    """Must run before the app is imported: these are read at import time."""
+    os.environ["GROQ_BASE_URL"] = fake_url
+    os.environ["GROQ_API_KEY"] = "fake"
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load_test.db')}"
+    os.environ["CHATBOT_EMBEDDINGS"] = "fake"
+    os.environ["CHATBOT_INDEX_DIR"] = os.path.join(workdir, "chroma")
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "uploads")
+    os.environ.setdefault("HF_TOKEN", "")
+    os.environ.setdefault("LLM_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("LLM_TOKENS_PER_MINUTE", "0")
+
+
+def synthesize_wav(path: str, seconds: float, rate: int = 16000):
+    """16 kHz mono WAV: 6.8 s tone / 1.2 s silence cycles, so preprocessing has pauses to split at."""
+    frames = bytearray()
+    for n in range(int(seconds * rate)):
+        t = n / rate
+        value = int(9000 * math.sin(2 * math.pi * 220 * t)) if t % 8 >= 1.2 else 0
+        frames += value.to_bytes(2, "little", signed=True)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(bytes(frames))
+
+
+def seed_user(speeches: int) -> str:
+    import crud
+    from database import SessionLocal
+    from auth import create_access_token
+    from orchestrator import build_feedback
+    from speech_metrics import compute_metrics_batch
+
+    with SessionLocal() as db:
+        user = crud.create_user(db, "loadtest", "loadtest@example.com", "load-test-password")
+        texts = [transcript(i, False) for i in range(speeches)]
+        items = [
+            {"transcript": text, "feedback": build_feedback({}, metrics)}
+            for text, metrics in zip(texts, compute_metrics_batch(texts))
+        ]
+        crud.save_speeches(db, user.id, items)
+        return create_access_token(data={"sub": user.email, "uid": user.id})
+
+
+# ------------------------------------------------
+# 🏃 Runner
+# ------------------------------------------------
+async def run_scenario(call, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    pending = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in pending:  # shared: every request index is taken by exactly one worker
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "throughput_rps": round(requests / wall, 2),
+        "wall_seconds": round(wall, 2),
+    }
+
+
+def scenario_calls(client, headers: dict, audio: bytes, args) -> dict:
+    from orchestrator import orchestrate_analysis_async
+
+    def ok(response) -> bool:
+        # /chat reports failures as {"error": ...} with a 200
+        return response.status_code < 400 and "error" not in response.json()
+
+    async def orchestrate(i):
+        feedback = await orchestrate_analysis_async(transcript(i, args.same_transcript), args.mode)
+        return not feedback.get("failed_agents")
+
+    async def analyze(i):
+        body = {"transcript": transcript(i, args.same_transcript), "mode": args.mode}
+        return ok(await client.post("/analyze", json=body, headers=headers))
+
+    async def analyze_audio(i):
+        files = {"file": ("rehearsal.wav", audio, "audio/wav")}
+        return ok(await client.post("/analyze_audio", files=files, headers=headers))
+
+    async def history(i):
+        return ok(await client.get("/history", params={"limit": 20}, headers=headers))
+
+    async def chat(i):
+        body = {"session_id": f"load-{i % args.concurrency}", "message": "How can I stop saying um so often?"}
+        return ok(await client.post("/chat", json=body))
+
+    async def generate_speech(i):
+        body = {"session_id": f"load-{i % args.concurrency}", "input": "A 2 minute speech about teamwork"}
+        return ok(await client.post("/generate-speech", json=body))
+
+    return {
+        "orchestrate": orchestrate,
+        "analyze": analyze,
+        "analyze_audio": analyze_audio,
+        "history": history,
+        "chat": chat,
+        "generate_speech": generate_speech,
+    }
+
+
+async def run(args, workdir: str) -> dict:
+    import httpx
+    import server
+
+    token = seed_user(args.seed_speeches)
+    audio_path = os.path.join(workdir, "rehearsal.wav")
+    synthesize_wav(audio_path, args.audio_seconds)
+    with open(audio_path, "rb") as f:
+        audio = f.read()
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.lifespan(server.app), httpx.AsyncClient(
+        transport=transport, base_url="http://load-test", timeout=None
+    ) as client:
+        calls = scenario_calls(client, {"Authorization": f"Bearer {token}"}, audio, args)
+        for name in args.scenarios:
+            results[name] = await run_scenario(calls[name], args.requests, args.concurrency)
+            print(format_row(name, results[name]), flush=True)
+    return results
+
+
+# ------------------------------------------------
+# 📈 Reporting
+# ------------------------------------------------
+HEADER = f"{'scenario':<17}{'req':>6}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}"
+
+
+def format_row(name: str, r: dict) -> str:
+    return (f"{name:<17}{r['requests']:>6}{r['errors']:>6}"
+            f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['throughput_rps']:>9.2f}")
+
+
+def change(new: float, old: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print the change against a baseline run. Returns the regressions over `threshold` percent."""
+    print(f"\nvs baseline {baseline['label']} ({baseline['timestamp']}, {baseline.get('git_commit') or 'unknown'})")
+    print(f"{'scenario':<17}{'p50':>9}{'p95':>9}{'p99':>9}{'req/s':>9}")
+    regressions = []
+    for name, r in results.items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            continue
+        deltas = {key: change(r[key], old[key]) for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")}
+        print(f"{name:<17}" + "".join(f"{deltas[key]:>+8.1f}%" for key in deltas))
+        if deltas["p95_ms"] > threshold:
+            regressions.append(f"{name}: p95 {old['p95_ms']} -> {r['p95_ms']} ms")
+        if -deltas["throughput_rps"] > threshold:
+            regressions.append(f"{name}: throughput {old['throughput_rps']} -> {r['throughput_rps']} req/s")
+    return regressions
+
+
+def fake_stats_of(port: int) -> dict:
+    """Requests, injected 429s and tokens as counted by the fake Groq."""
+    import httpx
+
+    stats = httpx.get(f"http://127.0.0.1:{port}/stats").json()
+    stats.pop("config", None)  # already in the run's config
+    return stats
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="load-test-")
+    port = free_port()
+    fake = start_fake_groq(args, port)
+    try:
+        configure_environment(f"http://127.0.0.1:{port}", workdir)
+        print(f"fake Groq on :{port}; {args.requests} requests per scenario at concurrency {args.concurrency}")
+        print(HEADER)
+        results = asyncio.run(run(args, workdir))
+        fake_stats = fake_stats_of(port)
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    now = datetime.now(timezone.utc)
+    label = args.label or now.strftime("%Y%m%d-%H%M%S")
+    report = {
+        "label": label,
+        "timestamp": now.isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "output")},
+        "fake_groq": fake_stats,
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{label}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nregressions over {args.threshold:g}%:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", default="parallel", help="analysis mode for orchestrate/analyze")
+    parser.add_argument("--same-transcript", action="store_true", help="reuse one transcript (cache hits)")
+    parser.add_argument("--audio-seconds", type=float, default=60)
+    parser.add_argument("--seed-speeches", type=int, default=200)
+    parser.add_argument("--label", help="run name (default: timestamp); results go to results/<label>.json")
+    parser.add_argument("--output", help="results file (overrides --label's default path)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold, percent")
+    fake_groq.add_arguments(parser.add_argument_group("fake Groq"))
+    main(parser.parse_args())
@@ -0,0 +1,89 @@
+"""
+Token budgeting for long transcripts (map-reduce analysis).
+
+Transcripts over CHUNK_TOKEN_BUDGET are split into sentence-aligned chunks that
+the orchestrator analyzes in parallel; reduce_sections folds the per-chunk results
+back into one summary/strengths/weaknesses/score section. Both steps are
+deterministic, so the same transcript always yields the same chunks and reduction.
+"""
+import os
+import re
+from collections import Counter
+from session_store import estimate_tokens
+
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "2000"))
+MAX_POINTS = int(os.getenv("CHUNK_MAX_POINTS", "5"))  # strengths/weaknesses kept after reducing
+
+SENTENCE_RE = re.compile(r"[^.!?]+(?:[.!?]+|$)")
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in SENTENCE_RE.findall(text or "") if s.strip()]
+
+
+def _split_long_sentence(sentence: str, budget: int) -> list[str]:
+    """Word-aligned pieces for a single sentence that is over budget on its own."""
+    pieces, current, used = [], [], 0
+    for word in sentence.split():
+        tokens = estimate_tokens(word + " ")
+        if current and used + tokens > budget:
+            pieces.append(" ".join(current))
+            current, used = [], 0
+        current.append(word)
+        used += tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_transcript(text: str, budget: int = CHUNK_TOKEN_BUDGET) -> list[str]:
+    """Greedily pack whole sentences into chunks of about `budget` tokens (one chunk if it fits)."""
+    if estimate_tokens(text) <= budget:
+        return [text]
+
+    chunks, current, used = [], [], 0
+    for sentence in split_sentences(text):
+        pieces = [sentence] if estimate_tokens(sentence) <= budget else _split_long_sentence(sentence, budget)
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and used + tokens > budget:
+                chunks.append(" ".join(current))
+                current, used = [], 0
+            current.append(piece)
+            used += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _top_points(lists: list[list[str]], limit: int = MAX_POINTS) -> list[str]:
+    """Most frequent points across chunks (case-insensitive), ties kept in first-seen order."""
+    counts = Counter()
+    first = {}
+    for points in lists:
+        for point in points:
+            key = point.strip().lower()
+            if not key:
+                continue
+            counts[key] += 1
+            first.setdefault(key, point.strip())
+    order = {key: i for i, key in enumerate(first)}
+    ranked = sorted(counts, key=lambda key: (-counts[key], order[key]))
+    return [first[key] for key in ranked[:limit]]
+
+
+def reduce_sections(sections: list[dict], weights: list[int]) -> dict:
+    """
+    Combine per-chunk sections into one: score is the token-weighted mean,
+    strengths/weaknesses the most repeated points, summary the chunk summaries in order.
+    """
+    total = sum(weights) or 1
+    score = sum(float(s["score"]) * w for s, w in zip(sections, weights)) / total
+    summaries = [s.get("summary", "").strip() for s in sections]
+    return {
+        "summary": " ".join(dict.fromkeys(s for s in summaries if s)),
+        "strengths": _top_points([s.get("strengths") or [] for s in sections]),
+        "weaknesses": _top_points([s.get("weaknesses") or [] for s in sections]),
+        "score": round(score, 1),
+        "chunks": len(sections),
+    }
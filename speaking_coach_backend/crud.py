@@ -1,21 +1,35 @@
 import json
-import bcrypt
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import User, Speech, Feedback
+import base64
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import insert, select, update, tuple_, func, literal, case, or_, and_, null
+from datetime import datetime, timezone, timedelta
+import numpy as np
+from progress import bucket_series
+from speech_metrics import compute_metrics_batch
+from password_hashing import hash_password, check_password
+from models import User, Speech, Feedback, AnalysisJob, UserStats
+from metrics import observe_crud
 
 
 # ==========================================================
 # 🧍 USER FUNCTIONS
 # ==========================================================
+@observe_crud
 def get_user_by_email(db: Session, email: str):
     """Fetch a user by email."""
     return db.query(User).filter(User.email == email).first()
 
 
-def create_user(db: Session, username: str, email: str, password: str):
-    """Create a new user with a hashed password."""
-    hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+@observe_crud
+def get_user_by_id(db: Session, user_id: int):
+    """Fetch a user by primary key."""
+    return db.get(User, user_id)
+
+
+@observe_crud
+def create_user(db: Session, username: str, email: str, password: str = None, password_hash: str = None):
+    """Create a new user with a hashed password (pass password_hash if it was hashed already)."""
+    hashed_pw = password_hash or hash_password(password)
     user = User(username=username, email=email, password_hash=hashed_pw)
     db.add(user)
     db.commit()
@@ -23,74 +37,238 @@ def create_user(db: Session, username: str, email: str, password: str):
     return user
 
 
+@observe_crud
+def update_user(db: Session, user_id: int, username: str = None, email: str = None):
+    """Update a user's profile fields. Returns the updated user, or None if not found."""
+    user = db.get(User, user_id)
+    if not user:
+        return None
+    if username:
+        user.username = username
+    if email:
+        user.email = email
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+@observe_crud
+def update_password_hash(db: Session, user_id: int, password_hash: str):
+    """Replace a user's stored hash (used to upgrade the bcrypt cost on login)."""
+    db.query(User).filter(User.id == user_id).update({"password_hash": password_hash})
+    db.commit()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Check if a given password matches the stored hash."""
-    return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    return check_password(plain_password, hashed_password)
 
 
 # ==========================================================
 # 🎙 SPEECH & FEEDBACK MANAGEMENT
 # ==========================================================
-def save_speech(db: Session, user_id: int, transcript: str, feedback: dict):
-    """Save a user's speech and its AI feedback into the database."""
+def _feedback_columns(feedback: dict) -> dict:
+    """Map an orchestrator feedback dict onto Feedback columns."""
+    columns = {
+        "opening": feedback.get("opening"),
+        "content": feedback.get("content"),
+        "delivery": feedback.get("delivery"),
+        "grammar": feedback.get("grammar"),
+        "overall": feedback.get("overall"),
+        "suggestions": list(feedback.get("suggestions") or []),
+        "score_opening": feedback.get("score_opening"),
+        "score_content": feedback.get("score_content"),
+        "score_delivery": feedback.get("score_delivery"),
+        "score_grammar": feedback.get("score_grammar"),
+        "score_overall": feedback.get("score_overall"),
+    }
+    # Left unset (SQL NULL, not JSON null) when missing so backfill_metrics can find the row
+    if feedback.get("metrics"):
+        columns["metrics"] = feedback["metrics"]
+    return columns
+
 
-    # 1️⃣ Save Speech
-    new_speech = Speech(user_id=user_id, transcript=transcript)
+@observe_crud
+def save_speech(db: Session, user_id: int, transcript: str, feedback: dict, job_id: str = None):
+    """
+    Save a user's speech, its AI feedback and the user's analytics aggregates
+    atomically (one flush, one commit). With job_id, the background job is marked
+    done with the result and speech id in the same commit, so a re-run can't save twice.
+    """
+    created_at = datetime.now(timezone.utc)
+    columns = _feedback_columns(feedback)
+    new_speech = Speech(user_id=user_id, transcript=transcript, created_at=created_at)
+    new_speech.feedback = Feedback(**columns)
     db.add(new_speech)
-    db.commit()
-    db.refresh(new_speech)
 
-    # 2️⃣ Helper to safely serialize nested data
-    def safe_json(value):
-        if isinstance(value, (dict, list)):
-            return json.dumps(value, ensure_ascii=False)
-        return value
+    try:
+        db.flush()  # writes the speech and feedback rows and assigns the speech id
+        speech_id = new_speech.id
+        increment_user_stats(db, user_id, [_scores_of(columns)], created_at)
+        if job_id is not None:
+            db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update({
+                "status": "done",
+                "result": json.dumps(feedback, ensure_ascii=False),
+                "speech_id": speech_id,
+            })
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
 
-    # 3️⃣ Save Feedback
-    new_feedback = Feedback(
-        opening=safe_json(feedback.get("opening")),
-        content=safe_json(feedback.get("content")),
-        delivery=safe_json(feedback.get("delivery")),
-        grammar=safe_json(feedback.get("grammar")),
-        overall=safe_json(feedback.get("overall")),
-        suggestions=", ".join(feedback.get("suggestions", [])),
-        score_opening=feedback.get("score_opening"),
-        score_content=feedback.get("score_content"),
-        score_delivery=feedback.get("score_delivery"),
-        score_grammar=feedback.get("score_grammar"),
-        score_overall=feedback.get("score_overall"),
-        speech_id=new_speech.id,
-    )
+    return speech_id
 
-    db.add(new_feedback)
-    db.commit()
-    db.refresh(new_feedback)
 
-    return new_speech.id
+def _insert_speeches(db: Session, user_id: int, items: list[dict], batch_size: int, now: datetime) -> list[int]:
+    """Multi-row INSERTs of speeches + feedback, batch_size rows per statement. Caller commits."""
+    speech_ids = []
+    for i in range(0, len(items), batch_size):
+        batch = items[i:i + batch_size]
+        ids = db.scalars(
+            insert(Speech).returning(Speech.id, sort_by_parameter_order=True),
+            [
+                {
+                    "user_id": user_id,
+                    "transcript": item["transcript"],
+                    "created_at": item.get("created_at") or now,
+                }
+                for item in batch
+            ],
+        ).all()
+        db.execute(
+            insert(Feedback),
+            [
+                {**_feedback_columns(item.get("feedback") or {}), "speech_id": speech_id}
+                for item, speech_id in zip(batch, ids)
+            ],
+        )
+        speech_ids.extend(ids)
+    return speech_ids
+
+
+@observe_crud
+def save_speeches(db: Session, user_id: int, items: list[dict], batch_size: int = 500):
+    """
+    Save freshly analyzed speeches ({"transcript", "feedback"}) in one transaction,
+    folding each into the user's aggregates. Returns the new speech ids in input order.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        speech_ids = _insert_speeches(db, user_id, items, batch_size, now)
+        scores = [_scores_of(_feedback_columns(item["feedback"])) for item in items]
+        increment_user_stats(db, user_id, scores, now)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return speech_ids
+
+
+@observe_crud
+def bulk_import_speeches(db: Session, user_id: int, items: list[dict], batch_size: int = 1000):
+    """
+    Import historical transcript + feedback pairs with batched multi-row INSERTs.
+    Each item is {"transcript": str, "feedback": dict, "created_at": datetime | None}.
+    The whole import is one transaction. Returns the new speech ids in input order.
+    """
+    # Imported feedback has no local metrics; compute them for the whole import in one pass
+    missing = [i for i, item in enumerate(items) if not (item.get("feedback") or {}).get("metrics")]
+    if missing:
+        items = list(items)
+        computed = compute_metrics_batch([items[i]["transcript"] for i in missing])
+        for i, metrics in zip(missing, computed):
+            items[i] = {**items[i], "feedback": {**(items[i].get("feedback") or {}), "metrics": metrics}}
+
+    try:
+        speech_ids = _insert_speeches(db, user_id, items, batch_size, datetime.now(timezone.utc))
+        # Imported dates can be anywhere in the past, so recompute streaks from scratch
+        rebuild_user_stats(db, user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return speech_ids
+
+
+@observe_crud
+def backfill_metrics(db: Session, batch_size: int = 500) -> int:
+    """Compute local speech metrics for feedback rows stored before they existed. Returns rows updated."""
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Feedback.id, Speech.transcript)
+            .join(Speech, Feedback.speech_id == Speech.id)
+            .where(Feedback.metrics.is_(None), Feedback.id > last_id)
+            .order_by(Feedback.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        metrics = compute_metrics_batch([row.transcript for row in rows])
+        db.execute(update(Feedback), [{"id": row.id, "metrics": m} for row, m in zip(rows, metrics)])
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+    return updated
 
 
 # ==========================================================
 # 📜 HISTORY FETCHING
 # ==========================================================
-def get_user_speeches(db: Session, user_id: int):
-    """Fetch all speeches for a user (latest first) with their feedback."""
-    speeches = (
+def encode_cursor(speech: Speech) -> str:
+    raw = json.dumps({"t": speech.created_at.isoformat(), "id": speech.id})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Return (created_at, id) from a /history cursor. Raises ValueError if malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), int(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _keyset_time(db: Session, value):
+    """
+    created_at as the /history keyset compares it. SQLite keeps timestamps as text, with
+    fractional seconds when written from Python and without them when written by
+    server_default=func.now(), so both sides are normalized to millisecond text there.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return value
+    if not hasattr(value, "type"):
+        value = literal(value, Speech.created_at.type)
+    return func.strftime("%Y-%m-%d %H:%M:%f", value)
+
+
+@observe_crud
+def get_user_speeches(db: Session, user_id: int, limit: int = 50, cursor: str = None):
+    """
+    Fetch one page of a user's speeches (latest first) with their feedback.
+    Keyset-paginated on (created_at, id); returns (speeches, next_cursor).
+    """
+    created = _keyset_time(db, Speech.created_at)
+    query = (
         db.query(Speech)
+        .options(joinedload(Speech.feedback))
         .filter(Speech.user_id == user_id)
-        .order_by(Speech.created_at.desc())
-        .all()
     )
+    if cursor:
+        created_at, speech_id = decode_cursor(cursor)
+        query = query.filter(tuple_(created, Speech.id) < tuple_(_keyset_time(db, created_at), speech_id))
 
-    def try_json(value):
-        """Convert JSON string back into dict/list if applicable."""
-        if not value:
-            return None
-        try:
-            if isinstance(value, str) and value.strip().startswith(("{", "[")):
-                return json.loads(value)
-            return value
-        except json.JSONDecodeError:
-            return value
+    speeches = (
+        query
+        .order_by(created.desc(), Speech.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(speeches[limit - 1]) if len(speeches) > limit else None
+    speeches = speeches[:limit]
 
     result = []
     for s in speeches:
@@ -100,44 +278,169 @@ def get_user_speeches(db: Session, user_id: int):
             "transcript": s.transcript,
             "created_at": s.created_at,
             "feedback": {
-                "opening": try_json(fb.opening) if fb else None,
-                "content": try_json(fb.content) if fb else None,
-                "delivery": try_json(fb.delivery) if fb else None,
-                "grammar": try_json(fb.grammar) if fb else None,
-                "overall": try_json(fb.overall) if fb else None,
-                "suggestions": fb.suggestions.split(", ") if fb and fb.suggestions else [],
+                "opening": fb.opening,
+                "content": fb.content,
+                "delivery": fb.delivery,
+                "grammar": fb.grammar,
+                "overall": fb.overall,
+                "suggestions": fb.suggestions or [],
+                "metrics": fb.metrics,
                 "scores": {
-                    "opening": fb.score_opening if fb else None,
-                    "content": fb.score_content if fb else None,
-                    "delivery": fb.score_delivery if fb else None,
-                    "grammar": fb.score_grammar if fb else None,
-                    "overall": fb.score_overall if fb else None,
-                } if fb else None,
+                    "opening": fb.score_opening,
+                    "content": fb.score_content,
+                    "delivery": fb.score_delivery,
+                    "grammar": fb.score_grammar,
+                    "overall": fb.score_overall,
+                },
             } if fb else None,
         })
-    return result
+    return result, next_cursor
 
 
 # ==========================================================
 # 📊 ANALYTICS FUNCTIONS
 # ==========================================================
-def get_user_analytics(db: Session, user_id: int):
-    """Return average scores and total sessions for analytics."""
-    result = (
-        db.query(
-            func.avg(Feedback.score_opening).label("avg_opening"),
-            func.avg(Feedback.score_content).label("avg_content"),
-            func.avg(Feedback.score_delivery).label("avg_delivery"),
-            func.avg(Feedback.score_grammar).label("avg_grammar"),
-            func.avg(Feedback.score_overall).label("avg_overall"),
-            func.count(Speech.id).label("total_speeches"),
-        )
-        .join(Speech, Feedback.speech_id == Speech.id)
-        .filter(Speech.user_id == user_id)
-        .first()
+SCORE_DIMENSIONS = ("opening", "content", "delivery", "grammar", "overall")
+
+
+def _scores_of(columns) -> dict:
+    """Score per dimension from feedback columns (dict) or a Feedback/row object."""
+    get = columns.get if isinstance(columns, dict) else lambda key: getattr(columns, key)
+    return {dim: get(f"score_{dim}") for dim in SCORE_DIMENSIONS}
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite hands back naive datetimes; treat them as UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _empty_stats() -> dict:
+    return {
+        "total_speeches": 0, "current_streak": 0, "longest_streak": 0,
+        "best_overall": None, "latest_overall": None, "latest_speech_at": None, "last_active_date": None,
+        **{f"sum_{d}": 0 for d in SCORE_DIMENSIONS},
+        **{f"count_{d}": 0 for d in SCORE_DIMENSIONS},
+    }
+
+
+def ensure_user_stats(db: Session, user_id: int):
+    """Create the user's aggregate row if it doesn't exist (INSERT ... ON CONFLICT DO NOTHING)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    else:
+        raise NotImplementedError(f"user_stats upsert is not implemented for {dialect}")
+    db.execute(
+        upsert(UserStats)
+        .values(user_id=user_id, **_empty_stats())
+        .on_conflict_do_nothing(index_elements=[UserStats.user_id])
     )
 
-    if not result:
+
+def increment_user_stats(db: Session, user_id: int, scores: list[dict], created_at: datetime):
+    """
+    Fold speeches saved at created_at into the user's aggregates with one UPDATE whose
+    SET clauses add to the stored values, so concurrent saves can't overwrite each other.
+    """
+    if not scores:
+        return
+    ensure_user_stats(db, user_id)
+    created_at = _as_utc(created_at)
+    t = UserStats.__table__.c
+    values = {"total_speeches": t.total_speeches + len(scores)}
+
+    for dim in SCORE_DIMENSIONS:
+        present = [s[dim] for s in scores if s.get(dim) is not None]
+        if present:
+            values[f"sum_{dim}"] = t[f"sum_{dim}"] + sum(present)
+            values[f"count_{dim}"] = t[f"count_{dim}"] + len(present)
+
+    overalls = [s["overall"] for s in scores if s.get("overall") is not None]
+    if overalls:
+        best = literal(max(overalls), t.best_overall.type)
+        values["best_overall"] = case((or_(t.best_overall.is_(None), t.best_overall < best), best),
+                                      else_=t.best_overall)
+
+    at = literal(created_at, t.latest_speech_at.type)
+    newer = or_(t.latest_speech_at.is_(None), t.latest_speech_at <= at)
+    latest = scores[-1].get("overall")
+    values["latest_speech_at"] = case((newer, at), else_=t.latest_speech_at)
+    values["latest_overall"] = case((newer, literal(latest, t.latest_overall.type) if latest is not None else null()),
+                                    else_=t.latest_overall)
+
+    # Streaks only move forward; out-of-order inserts are fixed by a rebuild
+    day = literal(created_at.date(), t.last_active_date.type)
+    yesterday = literal(created_at.date() - timedelta(days=1), t.last_active_date.type)
+    advances = or_(t.last_active_date.is_(None), t.last_active_date < day)
+    streak = case((t.last_active_date == yesterday, t.current_streak + 1), else_=1)
+    values["current_streak"] = case((advances, streak), else_=t.current_streak)
+    values["longest_streak"] = case((and_(advances, streak > t.longest_streak), streak), else_=t.longest_streak)
+    values["last_active_date"] = case((advances, day), else_=t.last_active_date)
+
+    db.execute(update(UserStats).where(UserStats.user_id == user_id).values(values))
+
+
+def apply_to_user_stats(stats: UserStats, scores: dict, created_at: datetime):
+    """Fold one speech's scores into aggregates held in memory (used by rebuild_user_stats)."""
+    created_at = _as_utc(created_at)
+    stats.total_speeches += 1
+    for dim in SCORE_DIMENSIONS:
+        value = scores.get(dim)
+        if value is not None:
+            setattr(stats, f"sum_{dim}", getattr(stats, f"sum_{dim}") + value)
+            setattr(stats, f"count_{dim}", getattr(stats, f"count_{dim}") + 1)
+
+    overall = scores.get("overall")
+    if overall is not None and (stats.best_overall is None or overall > stats.best_overall):
+        stats.best_overall = overall
+    if stats.latest_speech_at is None or created_at >= _as_utc(stats.latest_speech_at):
+        stats.latest_speech_at = created_at
+        stats.latest_overall = overall
+
+    day = created_at.date()
+    last = stats.last_active_date
+    if last is None or day > last:
+        stats.current_streak = stats.current_streak + 1 if last is not None and day == last + timedelta(days=1) else 1
+        stats.last_active_date = day
+        stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+
+
+@observe_crud
+def rebuild_user_stats(db: Session, user_id: int = None):
+    """
+    Recompute aggregates from the raw speech/feedback rows (all users, or one).
+    Repairs drift; the caller commits.
+    """
+    users = [user_id] if user_id is not None else db.scalars(select(User.id)).all()
+    for uid in users:
+        # Row-lock the aggregate before reading speeches: a concurrent save either
+        # committed already (and is counted) or adds its increment after this commit
+        ensure_user_stats(db, uid)
+        stats = (
+            db.query(UserStats).filter(UserStats.user_id == uid)
+            .with_for_update().populate_existing().one()
+        )
+        for key, value in _empty_stats().items():
+            setattr(stats, key, value)
+        rows = db.execute(
+            select(Speech.created_at, *(getattr(Feedback, f"score_{d}") for d in SCORE_DIMENSIONS))
+            .join(Feedback, Feedback.speech_id == Speech.id)
+            .where(Speech.user_id == uid)
+            .order_by(Speech.created_at.asc(), Speech.id.asc())
+        )
+        for row in rows:
+            apply_to_user_stats(stats, _scores_of(row), row.created_at)
+    db.flush()
+
+
+@observe_crud
+def get_user_analytics(db: Session, user_id: int):
+    """Return average scores, totals and streaks from the user's aggregate row."""
+    stats = db.get(UserStats, user_id)
+
+    if not stats:
         return {
             "avg_opening": 0,
             "avg_content": 0,
@@ -145,42 +448,105 @@ def get_user_analytics(db: Session, user_id: int):
             "avg_grammar": 0,
             "avg_overall": 0,
             "total_speeches": 0,
+            "best_overall": None,
+            "latest_overall": None,
+            "current_streak": 0,
+            "longest_streak": 0,
         }
 
+    def avg(dim):
+        count = getattr(stats, f"count_{dim}")
+        return round(getattr(stats, f"sum_{dim}") / count, 2) if count else 0
+
+    # A streak is only current if the user spoke today or yesterday
+    today = datetime.now(timezone.utc).date()
+    active = stats.last_active_date is not None and stats.last_active_date >= today - timedelta(days=1)
+
     return {
-        "avg_opening": round(result.avg_opening or 0, 2),
-        "avg_content": round(result.avg_content or 0, 2),
-        "avg_delivery": round(result.avg_delivery or 0, 2),
-        "avg_grammar": round(result.avg_grammar or 0, 2),
-        "avg_overall": round(result.avg_overall or 0, 2),
-        "total_speeches": result.total_speeches or 0,
+        "avg_opening": avg("opening"),
+        "avg_content": avg("content"),
+        "avg_delivery": avg("delivery"),
+        "avg_grammar": avg("grammar"),
+        "avg_overall": avg("overall"),
+        "total_speeches": stats.total_speeches,
+        "best_overall": stats.best_overall,
+        "latest_overall": stats.latest_overall,
+        "current_streak": stats.current_streak if active else 0,
+        "longest_streak": stats.longest_streak,
     }
 
 
 # ==========================================================
 # 📈 PROGRESS OVER TIME
 # ==========================================================
-def get_progress_over_time(db: Session, user_id: int):
-    """Return chronological score data for progress charts."""
-    speeches = (
-        db.query(Speech)
-        .filter(Speech.user_id == user_id)
+@observe_crud
+def get_progress_over_time(db: Session, user_id: int, bucket: str = "day", since: datetime = None, window: int = 3):
+    """
+    Return bucketed score series for progress charts: per day/week/month mean, min, max
+    and a trailing moving average per score dimension, limited to speeches after `since`.
+    """
+    query = (
+        select(Speech.created_at, *(getattr(Feedback, f"score_{d}") for d in SCORE_DIMENSIONS))
+        .join(Feedback, Feedback.speech_id == Speech.id)
+        .where(Speech.user_id == user_id)
         .order_by(Speech.created_at.asc())
-        .all()
     )
+    if since is not None:
+        query = query.where(Speech.created_at >= since)
+    rows = db.execute(query).all()
 
-    progress = []
-    for s in speeches:
-        fb = s.feedback
-        if not fb:
-            continue
-        progress.append({
-            "speech_id": s.id,
-            "date": s.created_at,
-            "score_opening": fb.score_opening,
-            "score_content": fb.score_content,
-            "score_delivery": fb.score_delivery,
-            "score_grammar": fb.score_grammar,
-            "score_overall": fb.score_overall,
-        })
-    return progress
+    times = np.array([_as_utc(r[0]).replace(tzinfo=None) for r in rows], dtype="datetime64[s]")
+    scores = np.array([r[1:] for r in rows], dtype=float).reshape(len(rows), len(SCORE_DIMENSIONS))
+    result = bucket_series(times, scores, list(SCORE_DIMENSIONS), bucket=bucket, window=window)
+    result["total_sessions"] = len(rows)
+    return result
+
+
+# ==========================================================
+# ⏳ BACKGROUND ANALYSIS JOBS
+# ==========================================================
+@observe_crud
+def create_job(db: Session, job_id: str, user_id: int, transcript: str = None,
+               audio_path: str = None, mode: str = None):
+    """Insert a queued analysis job."""
+    job = AnalysisJob(
+        id=job_id,
+        user_id=user_id,
+        transcript=transcript,
+        audio_path=audio_path,
+        mode=mode,
+        status="queued",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+@observe_crud
+def get_job(db: Session, job_id: str, user_id: int = None):
+    """Fetch a job, optionally restricted to its owner."""
+    query = db.query(AnalysisJob).filter(AnalysisJob.id == job_id)
+    if user_id is not None:
+        query = query.filter(AnalysisJob.user_id == user_id)
+    return query.first()
+
+
+@observe_crud
+def update_job(db: Session, job_id: str, **fields):
+    """Update job columns (status, transcript, result, error, speech_id...)."""
+    if isinstance(fields.get("result"), (dict, list)):
+        fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+    db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(fields)
+    db.commit()
+
+
+@observe_crud
+def get_unfinished_jobs(db: Session):
+    """Jobs that were queued or running when the server last stopped (oldest first)."""
+    return (
+        db.query(AnalysisJob)
+        .filter(AnalysisJob.status.in_(("queued", "running")))
+        .order_by(AnalysisJob.created_at.asc())
+        .all()
+    )
@@ -0,0 +1,236 @@
+"""
+In-process background queue for analysis jobs.
+
+Jobs are persisted in the analysis_jobs table, so status survives restarts and
+unfinished jobs are re-queued on startup. A job's recording is kept until the job
+is done or failed, and its speech is saved in the same commit that marks it done,
+so a re-queued job neither loses its audio nor saves its speech twice. Work runs
+on a bounded pool of asyncio workers; nothing outside the app's own database is required.
+"""
+import os
+import json
+import uuid
+import shutil
+import asyncio
+import logging
+import tempfile
+import crud
+from database import AsyncSessionLocal
+from orchestrator import orchestrate_analysis_async
+from transcription import transcribe_with_duration
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "100"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Recordings waiting for a worker; the queue owns (and deletes) everything in here
+JOB_AUDIO_DIR = os.getenv("JOB_AUDIO_DIR", os.path.join(tempfile.gettempdir(), "speaking_coach_jobs"))
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class QueueFull(Exception):
+    """Raised when JOB_QUEUE_MAX_DEPTH jobs are already waiting."""
+
+
+def job_status(job) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "speech_id": job.speech_id,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def job_result(job) -> dict:
+    return {
+        "speech_id": job.speech_id,
+        "transcript": job.transcript,
+        "feedback": json.loads(job.result) if job.result else None,
+    }
+
+
+async def _with_db(fn, *args, **kwargs):
+    """Run a sync crud function on a short-lived AsyncSession."""
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(fn, *args, **kwargs)
+
+
+class JobQueue:
+    def __init__(self, max_depth: int = JOB_QUEUE_MAX_DEPTH, workers: int = JOB_WORKERS):
+        self.max_depth = max_depth
+        self.workers = workers
+        self._queue = None
+        self._tasks = []
+        self._subscribers = {}  # job_id -> set of asyncio.Queue
+
+    # ------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_depth)
+        self._tasks = []
+        for _ in range(self.workers):
+            self._start_worker()
+
+        unfinished = await _with_db(crud.get_unfinished_jobs)
+        for job in unfinished[:self.max_depth]:
+            self._queue.put_nowait(job.id)
+        # Jobs beyond the queue's capacity would stay "queued" forever; fail them so clients stop polling
+        for job in unfinished[self.max_depth:]:
+            await self._update(job.id, status="failed", error="Dropped on restart: analysis queue was full.")
+            await self._discard_audio(job)
+        if unfinished:
+            logger.info("re-queued %d unfinished analysis jobs, failed %d over capacity",
+                        min(len(unfinished), self.max_depth), max(0, len(unfinished) - self.max_depth))
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _start_worker(self):
+        task = asyncio.create_task(self._worker())
+        task.add_done_callback(self._on_worker_exit)
+        self._tasks.append(task)
+
+    def _on_worker_exit(self, task: asyncio.Task):
+        """Replace a worker that died unexpectedly, so the queue keeps draining."""
+        if task not in self._tasks:
+            return  # stopped
+        self._tasks.remove(task)
+        if task.cancelled():
+            return
+        logger.error("analysis worker exited, restarting", exc_info=task.exception())
+        self._start_worker()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self._queue.qsize() if self._queue else 0,
+            "max_depth": self.max_depth,
+            "workers": self.workers,
+        }
+
+    # ------------------------------------------------
+    # Producer side
+    # ------------------------------------------------
+    async def submit(self, user_id: int, transcript: str = None, audio_path: str = None, mode: str = None) -> str:
+        """
+        Persist and enqueue a job. Raises QueueFull when the queue is at capacity.
+        An audio_path is moved into JOB_AUDIO_DIR: once submitted, the queue owns the recording.
+        """
+        if self._queue is None or self._queue.full():
+            raise QueueFull("Analysis queue is full, try again shortly.")
+
+        job_id = uuid.uuid4().hex
+        if audio_path:
+            os.makedirs(JOB_AUDIO_DIR, exist_ok=True)
+            owned = os.path.join(JOB_AUDIO_DIR, job_id + os.path.splitext(audio_path)[1])
+            audio_path = await asyncio.to_thread(shutil.move, audio_path, owned)
+        try:
+            job = await _with_db(crud.create_job, job_id, user_id, transcript, audio_path, mode)
+        except Exception:
+            if audio_path and os.path.exists(audio_path):
+                os.remove(audio_path)
+            raise
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            await self._update(job_id, status="failed", error="Analysis queue is full.")
+            await self._discard_audio(job)
+            raise QueueFull("Analysis queue is full, try again shortly.")
+        return job_id
+
+    async def get(self, job_id: str, user_id: int = None):
+        return await _with_db(crud.get_job, job_id, user_id)
+
+    async def subscribe(self, job_id: str, user_id: int, keepalive: float = 15.0):
+        """
+        Yield the job's status dict now and on every change until it finishes.
+        Yields None on idle intervals so callers can send keepalives.
+        """
+        updates = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(updates)
+        try:
+            job = await self.get(job_id, user_id)
+            if job is None:
+                return
+            status = job_status(job)
+            yield status
+            while status["status"] not in TERMINAL_STATUSES:
+                try:
+                    status = await asyncio.wait_for(updates.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                yield status
+        finally:
+            listeners = self._subscribers.get(job_id)
+            if listeners is not None:
+                listeners.discard(updates)
+                if not listeners:
+                    del self._subscribers[job_id]
+
+    # ------------------------------------------------
+    # Worker side
+    # ------------------------------------------------
+    async def _update(self, job_id: str, **fields):
+        await _with_db(crud.update_job, job_id, **fields)
+        await self._notify(job_id)
+
+    async def _notify(self, job_id: str):
+        job = await self.get(job_id)
+        for listener in self._subscribers.get(job_id, ()):
+            listener.put_nowait(job_status(job))
+
+    async def _discard_audio(self, job):
+        """Delete a finished job's recording. Only called once the job is done or failed."""
+        if job.audio_path:
+            if os.path.exists(job.audio_path):
+                os.remove(job.audio_path)
+            await _with_db(crud.update_job, job.id, audio_path=None)
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception:
+                # e.g. the database is what failed; the job is retried on the next restart
+                logger.exception("could not process analysis job %s", job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: str):
+        job = await self.get(job_id)
+        if job is None:
+            return
+        if job.status in TERMINAL_STATUSES or job.speech_id is not None:
+            await self._discard_audio(job)  # may be left over from a crash right after it finished
+            return
+        try:
+            await self._analyze(job)
+        except Exception as e:
+            logger.exception("analysis job %s failed", job_id)
+            await self._update(job_id, status="failed", error=str(e))
+        # Not reached on cancellation or a database error: the job is re-run with its audio
+        await self._discard_audio(job)
+
+    async def _analyze(self, job):
+        await self._update(job.id, status="running")
+
+        transcript = job.transcript
+        duration = None
+        if job.audio_path:
+            transcript, duration = await transcribe_with_duration(job.audio_path)
+            await self._update(job.id, transcript=transcript)
+
+        feedback = await orchestrate_analysis_async(transcript, job.mode, duration=duration)
+        await _with_db(crud.save_speech, job.user_id, transcript, feedback, job_id=job.id)
+        await self._notify(job.id)
+
+
+job_queue = JobQueue()
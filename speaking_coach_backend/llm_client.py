@@ -0,0 +1,466 @@
+"""
+Shared Groq chat client for every agent, the chatbot and the speech generator.
+
+get_llm(model, temperature) hands out one ChatGroq per (model, temperature), all
+sharing one HTTP connection pool (one per event loop on the async side, since
+orchestrate_analysis runs every call in a fresh asyncio.run loop). Every call goes through:
+  - a per-model token bucket (requests and tokens per minute) so bursts queue up
+    instead of hitting Groq's 429s; a 429's Retry-After pauses every caller,
+  - exponential backoff with full jitter on 429 / 5xx / connection errors
+    (the SDK's own retries are disabled so there is one retry policy),
+  - a per-model circuit breaker that fails fast while that model keeps failing.
+llm_stats() reports throttling, retries and breaker state for /llm/stats; the same
+events, plus tokens in/out, are exported per model at /metrics.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import weakref
+import threading
+import httpx
+import groq
+from dotenv import load_dotenv
+from langchain_groq import ChatGroq
+from session_store import estimate_tokens
+import metrics
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# Match these to the Groq plan's per-model limits (0 disables a bucket)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "60000"))
+# Completion tokens reserved up front; corrected once the real usage is known
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "512"))
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMUnavailable(RuntimeError):
+    """Raised without calling Groq while the circuit breaker is open."""
+
+
+# ------------------------------------------------
+# 📊 Metrics
+# ------------------------------------------------
+_lock = threading.Lock()
+counters = {
+    "calls": 0,
+    "successes": 0,
+    "failures": 0,
+    "retries": 0,
+    "rate_limited": 0,
+    "server_errors": 0,
+    "throttled": 0,
+    "throttle_wait_seconds": 0.0,
+    "breaker_rejections": 0,
+    "breaker_trips": 0,
+    "tokens_used": 0,
+}
+
+
+def _count(name: str, amount=1):
+    with _lock:
+        counters[name] += amount
+
+
+# ------------------------------------------------
+# 🪣 Token buckets
+# ------------------------------------------------
+class TokenBucket:
+    """Refills rate_per_minute units per minute up to one minute's worth. Reservations may go into debt."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60
+        self.level = rate_per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount now; return how long the caller must wait for it to be covered."""
+        if self.rate <= 0:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, amount: float):
+        if self.rate > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one model."""
+
+    def __init__(self, model: str = "", rpm: float = LLM_REQUESTS_PER_MINUTE, tpm: float = LLM_TOKENS_PER_MINUTE):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self.requests.reserve(1, now),
+                self.tokens.reserve(tokens, now),
+                self.paused_until - now,
+            )
+        if wait > 0:
+            _count("throttled")
+            _count("throttle_wait_seconds", wait)
+            metrics.LLM_THROTTLE_SECONDS.labels(model=self.model).inc(wait)
+        return wait
+
+    def adjust(self, reserved: int, used: int):
+        """Settle a reservation against the real token usage."""
+        with self._lock:
+            if used > reserved:
+                self.tokens.reserve(used - reserved, time.monotonic())
+            else:
+                self.tokens.refund(reserved - used)
+
+    def pause(self, seconds: float):
+        """Hold every caller for this model (Groq told us to back off)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens: int):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int):
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# ------------------------------------------------
+# 🔌 Circuit breaker
+# ------------------------------------------------
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures -> half-open (one trial call) after `cooldown`."""
+
+    def __init__(self, model: str = "", threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.model = model
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started = None  # set while the half-open trial call is in flight
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and now - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "closed":
+                return
+            # A trial that never reported back (e.g. cancelled) is abandoned after a cooldown
+            if self.state == "half_open" and (self.trial_started is None or now - self.trial_started >= self.cooldown):
+                self.trial_started = now
+                return
+        _count("breaker_rejections")
+        raise LLMUnavailable(f"LLM {self.model} temporarily unavailable (circuit open)")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                metrics.LLM_BREAKER_OPEN.labels(model=self.model).set(0)
+            self.state = "closed"
+            self.failures = 0
+            self.trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_started = None
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                metrics.LLM_BREAKER_OPEN.labels(model=self.model).set(1)
+                _count("breaker_trips")
+                logger.warning("LLM circuit for %s opened after %d consecutive failures", self.model, self.failures)
+
+    def release(self):
+        """A call ended without saying anything about the service (e.g. a 400): free the half-open trial."""
+        with self._lock:
+            self.trial_started = None
+
+
+_limiters = {}
+_breakers = {}
+
+
+def limiter_for(model: str) -> RateLimiter:
+    with _lock:
+        if model not in _limiters:
+            _limiters[model] = RateLimiter(model)
+        return _limiters[model]
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    with _lock:
+        if model not in _breakers:
+            _breakers[model] = CircuitBreaker(model)
+        return _breakers[model]
+
+
+# ------------------------------------------------
+# 🔁 Retry policy
+# ------------------------------------------------
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, groq.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+def retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, hint: float | None = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+    return max(delay, hint or 0.0)
+
+
+def _on_error(error: Exception, model: str, attempt: int) -> float:
+    """Record a failed attempt. Returns the delay before retrying, or re-raises."""
+    breaker = breaker_for(model)
+    if not is_retryable(error):
+        # A bad request (or a bug on our side) is neither a success nor a sign Groq is down
+        breaker.release()
+        _count("failures")
+        raise error
+    breaker.record_failure()
+    if isinstance(error, groq.RateLimitError):
+        _count("rate_limited")
+        reason = "rate_limited"
+    elif isinstance(error, groq.APIStatusError):
+        _count("server_errors")
+        reason = "server_error"
+    else:
+        reason = "connection"
+    if attempt >= LLM_MAX_RETRIES:
+        _count("failures")
+        raise error
+
+    hint = retry_after(error)
+    if hint:
+        limiter_for(model).pause(hint)
+    _count("retries")
+    metrics.LLM_RETRIES.labels(model=model, reason=reason).inc()
+    delay = backoff_delay(attempt, hint)
+    logger.info("LLM call failed (%s), retry %d in %.2fs", type(error).__name__, attempt + 1, delay)
+    return delay
+
+
+def _prompt_tokens(messages) -> int:
+    text = "".join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+    return estimate_tokens(text) + LLM_COMPLETION_TOKEN_ESTIMATE
+
+
+def _usage(result) -> dict:
+    """Provider token usage of a ChatResult ({} when not reported)."""
+    return (result.llm_output or {}).get("token_usage") or {}
+
+
+def _stream_usage(chunk, usage: dict) -> dict:
+    """Token usage carried by a streamed chunk (usually only the last one), else what was seen so far."""
+    meta = getattr(getattr(chunk, "message", None), "usage_metadata", None)
+    if not meta:
+        return usage
+    return {
+        "prompt_tokens": meta.get("input_tokens"),
+        "completion_tokens": meta.get("output_tokens"),
+        "total_tokens": meta.get("total_tokens"),
+    }
+
+
+def _settle(model: str, reserved: int, usage: dict | None = None):
+    breaker_for(model).record_success()
+    _count("successes")
+    usage = usage or {}
+    for direction, key in (("in", "prompt_tokens"), ("out", "completion_tokens")):
+        if usage.get(key):
+            metrics.LLM_TOKENS.labels(model=model, direction=direction).inc(usage[key])
+    used = usage.get("total_tokens")
+    if used is not None:
+        _count("tokens_used", used)
+        limiter_for(model).adjust(reserved, used)
+
+
+class ManagedChatGroq(ChatGroq):
+    """ChatGroq whose calls are rate-limited, retried with backoff and guarded by the circuit breaker."""
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = _prompt_tokens(messages)
+        _count("calls")
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            breaker_for(self.model_name).before_call()
+            limiter_for(self.model_name).acquire(tokens)
+            try:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                time.sleep(_on_error(e, self.model_name, attempt))
+                continue
+            _settle(self.model_name, tokens, _usage(result))
+            return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = _prompt_tokens(messages)
+        _count("calls")
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            breaker_for(self.model_name).before_call()
+            await limiter_for(self.model_name).aacquire(tokens)
+            try:
+                result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(_on_error(e, self.model_name, attempt))
+                continue
+            _settle(self.model_name, tokens, _usage(result))
+            return result
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Only retried before the first chunk; a half-sent answer can't be replayed
+        tokens = _prompt_tokens(messages)
+        _count("calls")
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            breaker_for(self.model_name).before_call()
+            limiter_for(self.model_name).acquire(tokens)
+            started, usage = False, {}
+            try:
+                for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    usage = _stream_usage(chunk, usage)
+                    yield chunk
+            except Exception as e:
+                if started:
+                    breaker_for(self.model_name).record_failure()
+                    _count("failures")
+                    raise
+                time.sleep(_on_error(e, self.model_name, attempt))
+                continue
+            _settle(self.model_name, tokens, usage)
+            return
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = _prompt_tokens(messages)
+        _count("calls")
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            breaker_for(self.model_name).before_call()
+            await limiter_for(self.model_name).aacquire(tokens)
+            started, usage = False, {}
+            try:
+                async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    usage = _stream_usage(chunk, usage)
+                    yield chunk
+            except Exception as e:
+                if started:
+                    breaker_for(self.model_name).record_failure()
+                    _count("failures")
+                    raise
+                await asyncio.sleep(_on_error(e, self.model_name, attempt))
+                continue
+            _settle(self.model_name, tokens, usage)
+            return
+
+
+# ------------------------------------------------
+# 🧠 Shared instances
+# ------------------------------------------------
+class PerLoopTransport(httpx.AsyncBaseTransport):
+    """
+    One connection pool per event loop, created on first use in that loop. Pooled
+    connections belong to the loop that opened them, so a pool shared across
+    asyncio.run calls fails with "Event loop is closed" once the first loop is gone.
+    """
+
+    def __init__(self, **options):
+        self._options = options
+        self._transports = weakref.WeakKeyDictionary()  # dropped with their loop
+        self._lock = threading.Lock()
+
+    def _current(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self._options)
+        return transport
+
+    async def handle_async_request(self, request):
+        return await self._current().handle_async_request(request)
+
+    async def aclose(self):
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+_limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+http_client = httpx.Client(limits=_limits, timeout=LLM_REQUEST_TIMEOUT)
+http_async_client = httpx.AsyncClient(transport=PerLoopTransport(limits=_limits), timeout=LLM_REQUEST_TIMEOUT)
+_llms = {}
+
+
+def get_llm(model: str, temperature: float = 0.2) -> ChatGroq:
+    """One shared client per (model, temperature); all of them reuse the same connection pools."""
+    key = (model, temperature)
+    with _lock:
+        if key not in _llms:
+            _llms[key] = ManagedChatGroq(
+                api_key=GROQ_API_KEY,
+                model=model,
+                temperature=temperature,
+                max_retries=0,
+                request_timeout=LLM_REQUEST_TIMEOUT,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+        return _llms[key]
+
+
+def llm_stats() -> dict:
+    with _lock:
+        stats = dict(counters)
+        limiters = dict(_limiters)
+        breakers = dict(_breakers)
+    stats["throttle_wait_seconds"] = round(stats["throttle_wait_seconds"], 2)
+    stats["models"] = {
+        model: {
+            "requests_available": round(limiter.requests.level, 1),
+            "tokens_available": round(limiter.tokens.level),
+            "breaker_state": breakers[model].state if model in breakers else "closed",
+        }
+        for model, limiter in limiters.items()
+    }
+    return stats
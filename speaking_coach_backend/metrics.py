@@ -0,0 +1,82 @@
+"""
+Prometheus metrics for the hot paths, served at /metrics.
+
+Latency histograms: HTTP routes, agents, Whisper transcription and crud queries.
+Counters: LLM tokens, retries and throttling, agent parse failures and fallbacks,
+analysis cache lookups. Everything LLM-related is labelled with the model name.
+Metrics are per process; with several workers, scrape each one (or run the
+client's multiprocess mode).
+"""
+import time
+import functools
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from timing import span
+
+# LLM calls and transcriptions take seconds; queries and cache hits take milliseconds
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# ------------------------------------------------
+# ⏱ Latency
+# ------------------------------------------------
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency (time to response headers)",
+    ["method", "route", "status"], buckets=SLOW_BUCKETS,
+)
+AGENT_LATENCY = Histogram(
+    "agent_duration_seconds", "LLM agent call latency (cache misses only)",
+    ["agent", "model", "outcome"], buckets=SLOW_BUCKETS,
+)
+TRANSCRIPTION_LATENCY = Histogram(
+    "transcription_request_duration_seconds", "Single Whisper request latency",
+    ["model"], buckets=SLOW_BUCKETS,
+)
+TRANSCRIPTION_TOTAL_LATENCY = Histogram(
+    "transcription_duration_seconds", "End-to-end transcription of a recording (preprocessing included)",
+    ["path"], buckets=SLOW_BUCKETS,
+)
+DB_LATENCY = Histogram(
+    "db_query_duration_seconds", "crud function latency",
+    ["operation"], buckets=FAST_BUCKETS,
+)
+
+# ------------------------------------------------
+# 🔢 Counters
+# ------------------------------------------------
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the LLM provider", ["model", "direction"])
+LLM_RETRIES = Counter("llm_retries_total", "LLM call attempts that were retried", ["model", "reason"])
+LLM_THROTTLE_SECONDS = Counter("llm_throttle_seconds_total", "Time spent waiting on the local rate limiter", ["model"])
+LLM_BREAKER_OPEN = Gauge("llm_circuit_open", "1 while the model's circuit breaker is open", ["model"])
+PARSE_FAILURES = Counter("agent_parse_failures_total", "Agent responses that were not valid JSON", ["agent", "model"])
+AGENT_FALLBACKS = Counter(
+    "agent_fallbacks_total", "Feedback sections not produced by their agent", ["agent", "kind"],
+)
+CACHE_LOOKUPS = Counter("analysis_cache_lookups_total", "Analysis cache lookups", ["agent", "model", "result"])
+HANDLER_ERRORS = Counter(
+    "handler_errors_total", "Errors a handler caught and reported in its response body or stream", ["handler"],
+)
+
+
+def observe_crud(fn):
+    """Decorator recording a crud function's latency (histogram and request span) under its name."""
+    histogram = DB_LATENCY.labels(operation=fn.__name__)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            with span(fn.__name__):
+                return fn(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+    return wrapper
+
+
+def route_label(request) -> str:
+    """Route template (/jobs/{job_id}) rather than the raw path, to keep label cardinality bounded."""
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+def render() -> tuple[bytes, str]:
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,50 @@
+"""
+Minimal schema migration runner.
+
+models.Base.metadata.create_all() only creates missing tables, so changes to
+existing tables (indexes, column types, data fixes) live in migrations/NNNN_name.py.
+Each module defines upgrade(conn) and runs once, inside its own transaction; applied
+versions are recorded in schema_migrations. Migrations must also be safe on a fresh
+database where create_all has already built the current schema.
+
+    python migrate.py        # apply pending migrations
+"""
+import importlib
+import pkgutil
+from sqlalchemy import text
+import migrations
+
+
+def available_migrations() -> list[str]:
+    return sorted(name for _, name, _ in pkgutil.iter_modules(migrations.__path__) if name[:4].isdigit())
+
+
+def run_migrations(engine) -> list[str]:
+    """Apply pending migrations in order. Returns the versions applied."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version VARCHAR(255) PRIMARY KEY, "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        applied = set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+    newly_applied = []
+    for version in available_migrations():
+        if version in applied:
+            continue
+        module = importlib.import_module(f"migrations.{version}")
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+        print(f"🛠 Applied migration {version}")
+        newly_applied.append(version)
+    return newly_applied
+
+
+if __name__ == "__main__":
+    import models
+    from database import engine
+
+    models.Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
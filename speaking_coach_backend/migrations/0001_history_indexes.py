@@ -0,0 +1,18 @@
+"""Indexes for keyset-paginated /history and one feedback row per speech."""
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_speeches_user_id_created_at "
+        "ON speeches (user_id, created_at, id)"
+    ))
+
+    # Older rows may have several feedback rows per speech; keep the newest one
+    conn.execute(text(
+        "DELETE FROM feedback WHERE speech_id IS NOT NULL AND id NOT IN ("
+        "SELECT MAX(id) FROM feedback WHERE speech_id IS NOT NULL GROUP BY speech_id)"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_feedback_speech_id ON feedback (speech_id)"
+    ))
@@ -0,0 +1,78 @@
+"""
+Feedback text columns -> JSON.
+
+Rewrites every stored value as a valid JSON document (plain strings are quoted,
+", "-joined suggestions become a list), then on Postgres converts the columns to
+JSONB. On SQLite the JSON type is stored as text, so only the data is rewritten.
+"""
+import json
+from sqlalchemy import text
+
+JSON_COLUMNS = ("opening", "content", "delivery", "grammar", "overall")
+BATCH_SIZE = 1000
+
+
+def _as_json_document(value):
+    if value is None:
+        return None
+    try:
+        json.loads(value)
+        return value
+    except (TypeError, ValueError):
+        return json.dumps(value, ensure_ascii=False)
+
+
+def _suggestions_document(value):
+    if value is None:
+        return None
+    try:
+        if isinstance(json.loads(value), list):
+            return value
+    except (TypeError, ValueError):
+        pass
+    return json.dumps([s for s in value.split(", ") if s], ensure_ascii=False)
+
+
+def _text_columns(conn) -> list[str]:
+    """Feedback columns that still need converting."""
+    columns = JSON_COLUMNS + ("suggestions",)
+    if conn.dialect.name != "postgresql":
+        return list(columns)
+    existing = set(conn.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = 'feedback' "
+        "AND data_type IN ('text', 'character varying')"
+    )).scalars())
+    return [c for c in columns if c in existing]
+
+
+def upgrade(conn):
+    columns = _text_columns(conn)
+    if not columns:
+        return  # fresh database, already created as JSON
+
+    select_cols = ", ".join(columns)
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(f"SELECT id, {select_cols} FROM feedback WHERE id > :last ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": BATCH_SIZE},
+        ).mappings().all()
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            new = {
+                c: _suggestions_document(row[c]) if c == "suggestions" else _as_json_document(row[c])
+                for c in columns
+            }
+            if any(new[c] != row[c] for c in columns):
+                updates.append({"id": row["id"], **new})
+        if updates:
+            assignments = ", ".join(f"{c} = :{c}" for c in columns)
+            conn.execute(text(f"UPDATE feedback SET {assignments} WHERE id = :id"), updates)
+        last_id = rows[-1]["id"]
+
+    if conn.dialect.name == "postgresql":
+        for c in columns:
+            conn.execute(text(f"ALTER TABLE feedback ALTER COLUMN {c} TYPE JSONB USING {c}::jsonb"))
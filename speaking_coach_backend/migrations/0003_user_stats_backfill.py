@@ -0,0 +1,10 @@
+"""Backfill user_stats (created by create_all) from existing speeches."""
+from sqlalchemy.orm import Session
+
+
+def upgrade(conn):
+    import crud
+
+    db = Session(bind=conn)
+    crud.rebuild_user_stats(db)
+    db.flush()
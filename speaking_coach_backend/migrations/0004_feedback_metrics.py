@@ -0,0 +1,9 @@
+"""Add feedback.metrics (local speech metrics). Run backfill_metrics.py to fill older rows."""
+from sqlalchemy import inspect, text
+
+
+def upgrade(conn):
+    if "metrics" in {c["name"] for c in inspect(conn).get_columns("feedback")}:
+        return  # fresh database, created with the column
+    column_type = "JSONB" if conn.dialect.name == "postgresql" else "JSON"
+    conn.execute(text(f"ALTER TABLE feedback ADD COLUMN metrics {column_type}"))
@@ -0,0 +1,17 @@
+"""
+Finish 0002 on Postgres databases where it converted only the first feedback column.
+
+0002 read its column list from a one-shot result, so content, delivery, grammar,
+overall and suggestions could be left as TEXT (suggestions still ", "-joined) while
+the migration was recorded as applied. Re-running its upgrade converts whatever is
+still text; on SQLite and on already-converted databases it finds nothing to do.
+"""
+import importlib
+
+feedback_json = importlib.import_module("migrations.0002_feedback_json")
+
+
+def upgrade(conn):
+    if conn.dialect.name != "postgresql":
+        return  # 0002 rewrote every column on SQLite
+    feedback_json.upgrade(conn)
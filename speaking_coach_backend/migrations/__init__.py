@@ -0,0 +1 @@
+"""Schema migrations applied by migrate.run_migrations (one module per version)."""
@@ -1,8 +1,12 @@
 # speaking_coach_backend/models.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, Float, Date, ForeignKey, DateTime, Index, JSON, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from database import Base
 
+# Native JSONB on Postgres (queryable server-side), JSON-as-text elsewhere (SQLite)
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class User(Base):
     __tablename__ = "users"
 
@@ -25,16 +29,22 @@ class Speech(Base):
 
     feedback = relationship("Feedback", back_populates="speech", uselist=False)
 
+    # Keyset pagination for /history walks (user_id, created_at, id)
+    __table_args__ = (
+        Index("ix_speeches_user_id_created_at", "user_id", "created_at", "id"),
+    )
+
 class Feedback(Base):
     __tablename__ = "feedback"
 
     id = Column(Integer, primary_key=True, index=True)
-    opening = Column(Text)
-    content = Column(Text)
-    delivery = Column(Text)
-    grammar = Column(Text)
-    overall = Column(Text)
-    suggestions = Column(Text)
+    opening = Column(JSONType)
+    content = Column(JSONType)
+    delivery = Column(JSONType)
+    grammar = Column(JSONType)
+    overall = Column(JSONType)
+    suggestions = Column(JSONType)  # list of strings
+    metrics = Column(JSONType)  # local speech metrics (speech_metrics.py)
 
     # ✅ New numeric scores
     score_opening = Column(Integer)
@@ -46,3 +56,72 @@ class Feedback(Base):
     speech_id = Column(Integer, ForeignKey("speeches.id"))
     speech = relationship("Speech", back_populates="feedback")
 
+    __table_args__ = (
+        Index("uq_feedback_speech_id", "speech_id", unique=True),
+    )
+
+
+class AnalysisCacheEntry(Base):
+    """Persistent tier of the agent analysis cache (see analysis_cache.py)."""
+    __tablename__ = "analysis_cache"
+
+    key = Column(String(64), primary_key=True)
+    agent = Column(String, nullable=False)
+    model = Column(String, nullable=False)
+    result = Column(Text, nullable=False)  # JSON
+    elapsed_ms = Column(Float)  # how long the original LLM call took
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(Float, index=True)  # unix timestamp
+
+
+class AnalysisJob(Base):
+    """Background analysis request processed by the job queue (see jobs.py)."""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(36), primary_key=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued | running | done | failed
+    mode = Column(String)
+    transcript = Column(Text)
+    audio_path = Column(String)  # set for /analyze_audio jobs until transcribed
+    result = Column(Text)  # JSON feedback
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    speech_id = Column(Integer, ForeignKey("speeches.id"))
+
+
+class UserStats(Base):
+    """
+    Per-user running aggregates for /analytics, updated in the same transaction
+    as crud.save_speech. Rebuild from raw rows with `python rebuild_stats.py`.
+    """
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_speeches = Column(Integer, default=0, nullable=False)
+
+    # Running sums / non-null counts per score dimension
+    sum_opening = Column(Float, default=0, nullable=False)
+    count_opening = Column(Integer, default=0, nullable=False)
+    sum_content = Column(Float, default=0, nullable=False)
+    count_content = Column(Integer, default=0, nullable=False)
+    sum_delivery = Column(Float, default=0, nullable=False)
+    count_delivery = Column(Integer, default=0, nullable=False)
+    sum_grammar = Column(Float, default=0, nullable=False)
+    count_grammar = Column(Integer, default=0, nullable=False)
+    sum_overall = Column(Float, default=0, nullable=False)
+    count_overall = Column(Integer, default=0, nullable=False)
+
+    best_overall = Column(Float)
+    latest_overall = Column(Float)
+    latest_speech_at = Column(DateTime(timezone=True))
+
+    # Consecutive days with at least one speech
+    last_active_date = Column(Date)
+    current_streak = Column(Integer, default=0, nullable=False)
+    longest_streak = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
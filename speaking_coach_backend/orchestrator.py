@@ -1,27 +1,255 @@
-from agents.content_agent import analyze_content
-from agents.delivery_agent import analyze_delivery
-from agents.grammar_agent import analyze_grammar
+import os
+import copy
+import time
+import asyncio
+import logging
+import functools
+from contextlib import nullcontext
+from agents import content_agent, delivery_agent, grammar_agent, combined_agent
+from analysis_cache import analysis_cache, make_key, normalize_transcript
+from speech_metrics import compute_metrics, compute_metrics_batch, ESTIMATORS
+from chunking import chunk_transcript, reduce_sections
+from session_store import estimate_tokens
+from agents.parsing import AgentOutputError, validate_section
+from timing import span
+from metrics import AGENT_LATENCY, AGENT_FALLBACKS, CACHE_LOOKUPS, PARSE_FAILURES
 
-def orchestrate_analysis(transcript: str) -> dict:
-    # Run analyses
-    content = analyze_content(transcript)
-    delivery = analyze_delivery(transcript)
-    grammar = analyze_grammar(transcript)
+logger = logging.getLogger(__name__)
+
+# Per-agent timeout (seconds) for a single LLM round trip
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT_SECONDS", "45"))
+
+# "parallel" runs one LLM call per agent; "combined" sends the transcript once
+ANALYSIS_MODES = ("parallel", "combined")
+DEFAULT_ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "parallel")
+
+# LLM calls in flight across all batch analyses (cache hits don't take a slot)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+_batch_limiter = None
+
+AGENTS = {
+    "content": content_agent,
+    "delivery": delivery_agent,
+    "grammar": grammar_agent,
+}
+
+
+def batch_limiter() -> asyncio.Semaphore:
+    """Process-wide semaphore shared by every batch (created on first use, inside the event loop)."""
+    global _batch_limiter
+    if _batch_limiter is None:
+        _batch_limiter = asyncio.Semaphore(BATCH_CONCURRENCY)
+    return _batch_limiter
+
+
+async def _cached(name: str, agent, transcript: str, analyze, validate, limiter=None) -> dict:
+    """
+    Serve an agent result from the analysis cache, calling the LLM only on a miss.
+    validate normalizes a result or raises AgentOutputError; only valid results are stored,
+    and an invalid entry cached by an earlier version is treated as a miss.
+    """
+    key = make_key(transcript, name, agent.MODEL, agent.PROMPT_VERSION)
+    with span("cache_lookup"):
+        result = await analysis_cache.aget(key)
+    if result is not None:
+        try:
+            result = validate(result)
+        except AgentOutputError:
+            logger.warning("%s: ignoring an invalid cached result", name)
+            result = None
+    labels = {"agent": f"analyze_{name}", "model": agent.MODEL}
+    CACHE_LOOKUPS.labels(**labels, result="miss" if result is None else "hit").inc()
+    if result is not None:
+        return result
+
+    async with limiter or nullcontext():
+        with span(labels["agent"]):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                result = validate(await asyncio.wait_for(analyze(transcript), timeout=AGENT_TIMEOUT))
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            except AgentOutputError:
+                outcome = "parse_error"
+                PARSE_FAILURES.labels(**labels).inc()
+                raise
+            finally:
+                AGENT_LATENCY.labels(**labels, outcome=outcome).observe(time.perf_counter() - start)
+    await analysis_cache.aset(key, name, agent.MODEL, result, (time.perf_counter() - start) * 1000)
+    return result
+
+
+async def _map_reduce(name: str, agent, chunks: list[str], analyze, validate, limiter, reduce) -> dict:
+    """
+    One cached call when the transcript fits in a single chunk; otherwise every chunk is
+    analyzed in parallel and the results reduced. Failed chunks are dropped from the reduction.
+    """
+    if len(chunks) == 1:
+        return await _cached(name, agent, chunks[0], analyze, validate, limiter)
+
+    results = await asyncio.gather(
+        *(_cached(name, agent, chunk, analyze, validate, limiter) for chunk in chunks),
+        return_exceptions=True,
+    )
+    done = [(result, estimate_tokens(chunk)) for result, chunk in zip(results, chunks)
+            if not isinstance(result, BaseException)]
+    if not done:
+        raise results[0]
+    if len(done) < len(chunks):
+        logger.warning("%s: %d of %d chunks failed", name, len(chunks) - len(done), len(chunks))
+    return reduce([result for result, _ in done], [weight for _, weight in done])
+
+
+def _reduce_combined(results: list[dict], weights: list[int]) -> dict:
+    return {
+        section: reduce_sections([result[section] for result in results], weights)
+        for section in combined_agent.SECTIONS
+    }
+
+
+async def _run_agent(name: str, agent, chunks: list[str], limiter=None) -> dict | None:
+    """Run one agent with a timeout. Returns None when the agent fails."""
+    analyze = getattr(agent, f"aanalyze_{name}")
+    try:
+        validate = functools.partial(validate_section, name=name)
+        return await _map_reduce(name, agent, chunks, analyze, validate, limiter, reduce_sections)
+    except asyncio.TimeoutError:
+        logger.warning("%s agent timed out after %ss", name, AGENT_TIMEOUT)
+    except Exception as e:
+        logger.warning("%s agent failed: %s", name, e)
+    return None
+
+
+def build_feedback(results: dict, metrics: dict | None = None) -> dict:
+    """
+    Combine per-agent results into the structured feedback stored by crud.save_speech.
+    Failed delivery/grammar agents (None) are estimated from the local speech metrics;
+    other failed agents get their fallback section and are left out of the overall score.
+    """
+    sections = {}
+    failed = []
+    estimated = []
+    for name, agent in AGENTS.items():
+        section = results.get(name)
+        if section is None:
+            failed.append(name)
+            if metrics and name in ESTIMATORS:
+                estimated.append(name)
+                section = ESTIMATORS[name](metrics)
+            else:
+                section = agent.fallback_result()
+            kind = "estimated" if name in estimated else "default"
+            AGENT_FALLBACKS.labels(agent=f"analyze_{name}", kind=kind).inc()
+        sections[name] = section
+
+    scores = {
+        name: sections[name]["score"] if name not in failed or name in estimated else None
+        for name in AGENTS
+    }
+    scored = [score for score in scores.values() if score is not None]
+    overall = round(sum(scored) / len(scored), 1) if scored else None
 
-    # Build clean structured feedback
     feedback = {
-        "content": content,
-        "delivery": delivery,
-        "grammar": grammar,
+        **sections,
         "overall": {
             "summary": "Balanced overall performance with room for improvement.",
-            "score": round((content["score"] + delivery["score"] + grammar["score"]) / 3, 1)
+            "score": overall if overall is not None else 0
         },
         "suggestions": list(set(
-            content.get("weaknesses", []) +
-            delivery.get("weaknesses", []) +
-            grammar.get("weaknesses", [])
-        ))
+            sections["content"].get("weaknesses", []) +
+            sections["delivery"].get("weaknesses", []) +
+            sections["grammar"].get("weaknesses", [])
+        )),
+        # Stored in the numeric score columns (None keeps a failed agent out of the analytics)
+        **{f"score_{name}": round(score) if score is not None else None for name, score in scores.items()},
+        "score_overall": round(overall) if overall is not None else None,
     }
+    if metrics:
+        feedback["metrics"] = metrics
+    if failed:
+        feedback["failed_agents"] = failed
+    if estimated:
+        feedback["estimated_sections"] = estimated
 
     return feedback
+
+
+async def _run_combined(chunks: list[str], limiter=None) -> dict | None:
+    """Single-pass analysis. Returns None so the caller can fall back to the per-agent path."""
+    try:
+        return await _map_reduce(
+            "combined", combined_agent, chunks, combined_agent.aanalyze_combined,
+            combined_agent.validate_sections, limiter, _reduce_combined,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("combined analysis timed out after %ss", AGENT_TIMEOUT)
+    except Exception as e:
+        logger.warning("combined analysis failed, falling back to per-agent path: %s", e)
+    return None
+
+
+async def orchestrate_analysis_async(transcript: str, mode: str | None = None, limiter=None,
+                                     duration: float | None = None, metrics: dict | None = None) -> dict:
+    """
+    Analyze a transcript and return structured feedback.
+    mode="parallel" fans the content, delivery and grammar agents out concurrently;
+    mode="combined" makes one structured call and falls back to "parallel" if it can't be parsed.
+    limiter (a semaphore) bounds the LLM calls this analysis may have in flight.
+    duration (audio seconds) enables words per minute in the local metrics.
+    Transcripts over CHUNK_TOKEN_BUDGET tokens are map-reduced (see chunking.py).
+    """
+    mode = mode or DEFAULT_ANALYSIS_MODE
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode '{mode}'. Expected one of {ANALYSIS_MODES}.")
+    if metrics is None:
+        with span("speech_metrics"):
+            metrics = compute_metrics(transcript, duration)
+    # Long transcripts are split into sentence-aligned chunks analyzed in parallel
+    chunks = chunk_transcript(transcript)
+
+    if mode == "combined":
+        sections = await _run_combined(chunks, limiter)
+        if sections is not None:
+            return build_feedback(sections, metrics)
+        AGENT_FALLBACKS.labels(agent="analyze_combined", kind="parallel").inc()
+
+    results = await asyncio.gather(*(
+        _run_agent(name, agent, chunks, limiter) for name, agent in AGENTS.items()
+    ))
+    return build_feedback(dict(zip(AGENTS, results)), metrics)
+
+
+async def orchestrate_batch_async(transcripts: list[str], mode: str | None = None) -> list:
+    """
+    Analyze many transcripts at once. Every agent call goes through the shared batch
+    limiter, so total time scales with BATCH_CONCURRENCY rather than len(transcripts).
+    Identical transcripts are analyzed once. Returns feedback or the raised exception per item.
+    """
+    unique = {}
+    for transcript in transcripts:
+        unique.setdefault(normalize_transcript(transcript), transcript)
+
+    limiter = batch_limiter()
+    metrics = compute_metrics_batch(list(unique.values()))
+    results = await asyncio.gather(
+        *(
+            orchestrate_analysis_async(transcript, mode, limiter, metrics=transcript_metrics)
+            for transcript, transcript_metrics in zip(unique.values(), metrics)
+        ),
+        return_exceptions=True,
+    )
+    by_key = dict(zip(unique, results))
+
+    outcomes = []
+    for transcript in transcripts:
+        result = by_key[normalize_transcript(transcript)]
+        outcomes.append(result if isinstance(result, BaseException) else copy.deepcopy(result))
+    return outcomes
+
+
+def orchestrate_analysis(transcript: str, mode: str | None = None, duration: float | None = None) -> dict:
+    """Synchronous entry point (scripts and sync routes). Must not be called from a running event loop."""
+    return asyncio.run(orchestrate_analysis_async(transcript, mode, duration=duration))
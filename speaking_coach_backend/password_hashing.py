@@ -0,0 +1,78 @@
+"""
+bcrypt hashing on a dedicated, bounded process pool.
+
+Hashing runs outside the request threadpool so a burst of logins can't starve
+analysis requests. BCRYPT_ROUNDS sets the work factor for new hashes; hashes
+stored with a different cost are upgraded on the next successful login.
+"""
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def _check(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the pool starts lazily inside a threaded server, and workers only need bcrypt
+            _pool = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def hash_cost(hashed: str) -> int | None:
+    """Work factor of a bcrypt hash ("$2b$12$..." -> 12)."""
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    return hash_cost(hashed) != rounds
+
+
+# ---------------------------
+# Blocking API (waits on the pool; for sync code paths)
+# ---------------------------
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return get_pool().submit(_hash, password, rounds).result()
+
+
+def check_password(password: str, hashed: str) -> bool:
+    return get_pool().submit(_check, password, hashed).result()
+
+
+# ---------------------------
+# Async API (never blocks the event loop or a threadpool slot)
+# ---------------------------
+async def ahash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), _hash, password, rounds)
+
+
+async def acheck_password(password: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), _check, password, hashed)
@@ -0,0 +1,77 @@
+"""
+Vectorized bucketing/downsampling of score history for /progress.
+
+Input is one timestamp and one row of scores per speech (sorted by time); output
+is one point per day/week/month with mean/min/max and a trailing moving average
+per score dimension, so the payload size depends on the window, not the history.
+"""
+import numpy as np
+
+BUCKETS = ("day", "week", "month")
+
+
+def bucket_starts(times: np.ndarray, bucket: str) -> np.ndarray:
+    """Floor datetime64 timestamps to the start of their day, ISO week (Monday) or month."""
+    days = times.astype("datetime64[D]")
+    if bucket == "day":
+        return days
+    if bucket == "week":
+        # 1970-01-01 was a Thursday (weekday 3 with Monday = 0)
+        return days - ((days.astype(np.int64) + 3) % 7)
+    if bucket == "month":
+        return times.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"Unknown bucket '{bucket}'. Expected one of {BUCKETS}.")
+
+
+def trailing_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """NaN-aware trailing moving average over the last `window` points."""
+    valid = ~np.isnan(values)
+    kernel = np.ones(window)
+    sums = np.convolve(np.where(valid, values, 0.0), kernel)[:len(values)]
+    counts = np.convolve(valid.astype(float), kernel)[:len(values)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _to_list(values: np.ndarray) -> list:
+    rounded = np.round(values, 2)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+def bucket_series(times: np.ndarray, scores: np.ndarray, dimensions: list[str],
+                  bucket: str = "day", window: int = 3) -> dict:
+    """
+    times: datetime64 array (ascending); scores: float array of shape (n, len(dimensions)), NaN = missing.
+    Returns {"points": [...], "series": {dimension: {"mean", "min", "max", "moving_avg"}}}.
+    """
+    if len(times) == 0:
+        return {"points": [], "series": {d: {"mean": [], "min": [], "max": [], "moving_avg": []} for d in dimensions}}
+
+    keys = bucket_starts(times, bucket)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    sessions = np.diff(np.r_[starts, len(keys)])
+    dates = keys[starts].astype(str).tolist()
+
+    valid = ~np.isnan(scores)
+    sums = np.add.reduceat(np.where(valid, scores, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid, starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    mins = np.fmin.reduceat(scores, starts, axis=0)
+    maxs = np.fmax.reduceat(scores, starts, axis=0)
+
+    series = {}
+    for i, dim in enumerate(dimensions):
+        series[dim] = {
+            "mean": _to_list(means[:, i]),
+            "min": _to_list(mins[:, i]),
+            "max": _to_list(maxs[:, i]),
+            "moving_avg": _to_list(trailing_mean(means[:, i], window)),
+        }
+
+    # Chart-friendly rows (same keys the per-speech /progress points used)
+    points = [
+        {"date": date, "sessions": int(n), **{f"score_{d}": series[d]["mean"][j] for d in dimensions}}
+        for j, (date, n) in enumerate(zip(dates, sessions))
+    ]
+    return {"points": points, "series": series}
@@ -0,0 +1,20 @@
+"""
+Recompute the user_stats analytics aggregates from raw speech/feedback rows.
+
+    python rebuild_stats.py              # every user
+    python rebuild_stats.py --user-id 7  # one user
+"""
+import argparse
+import crud, models
+from database import SessionLocal, engine
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-user analytics aggregates.")
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        crud.rebuild_user_stats(db, args.user_id)
+        db.commit()
+    print("✅ Analytics aggregates rebuilt", f"for user {args.user_id}" if args.user_id else "for all users")
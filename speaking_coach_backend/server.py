@@ -1,26 +1,57 @@
 from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Request
-from sqlalchemy.orm import Session
-from database import SessionLocal, engine
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from contextlib import asynccontextmanager
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from database import AsyncSessionLocal, async_engine, engine
 import crud, models
-from pydantic import BaseModel
-from auth import create_access_token, get_current_user
-from crud import verify_password
-from orchestrator import orchestrate_analysis
+from migrate import run_migrations
+from pydantic import BaseModel, field_validator
+from auth import create_access_token, get_current_db_user, CurrentUser, invalidate_user
+from password_hashing import ahash_password, acheck_password, needs_rehash, shutdown_pool
+from orchestrator import orchestrate_analysis_async, orchestrate_batch_async, ANALYSIS_MODES
+from analysis_cache import analysis_cache
+from llm_client import llm_stats, http_async_client
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from groq import Groq
+from transcription import save_upload, transcribe_audio, UploadTooLarge
+from jobs import job_queue, job_status, job_result, QueueFull
+from upload_sessions import upload_sessions, UploadSessionNotFound, OffsetMismatch, UploadIncomplete
+from sse import format_sse, SSE_HEADERS, SSE_KEEPALIVE
+from metrics import REQUEST_LATENCY, HANDLER_ERRORS, route_label, render as render_metrics
+from timing import instrument_request, span, record_since_request_start
 from agents.chatbot import create_chatbot
 from agents.speech_generator import create_speech_generator
 from agents.speech_generator import estimate_word_count
-import os, tempfile
+from session_store import SessionStore
+import os
+import time
+import logging
+from datetime import datetime, timezone, timedelta
+from progress import BUCKETS
 
 # ------------------------------------------------
 # 🌍 Setup
 # ------------------------------------------------
 load_dotenv()
+logger = logging.getLogger(__name__)
 models.Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
-app = FastAPI(title="AI Speaking Coach API", version="2.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.start()
+    upload_sessions.start_gc()
+    yield
+    await upload_sessions.stop_gc()
+    await job_queue.stop()
+    shutdown_pool()
+    await async_engine.dispose()
+    await http_async_client.aclose()
+
+
+app = FastAPI(title="AI Speaking Coach API", version="2.0", lifespan=lifespan)
 
 # ✅ Allow frontend access
 app.add_middleware(
@@ -31,15 +62,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+# ✅ Per-route latency for /metrics (label is the route template, e.g. /jobs/{job_id})
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_LATENCY.labels(
+            method=request.method, route=route_label(request), status=str(status)
+        ).observe(time.perf_counter() - start)
+
+
+# ✅ Server-Timing header, ?timing=tree breakdown and opt-in profiling (see timing.py)
+@app.middleware("http")
+async def record_timing(request: Request, call_next):
+    return await instrument_request(request, call_next)
+
 # ------------------------------------------------
 # 🗄️ Database Dependency
 # ------------------------------------------------
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 # ------------------------------------------------
@@ -58,6 +107,52 @@ class UserLogin(BaseModel):
 
 class SpeechInput(BaseModel):
     transcript: str
+    mode: str | None = None  # "parallel" (default) or "combined"
+
+
+class UploadSessionCreate(BaseModel):
+    total_size: int
+    filename: str = ""
+
+
+class SpeechBatch(BaseModel):
+    transcripts: list[str]
+    mode: str | None = None
+
+
+class ImportedFeedback(BaseModel):
+    opening: dict | None = None
+    content: dict | None = None
+    delivery: dict | None = None
+    grammar: dict | None = None
+    overall: dict | None = None
+    suggestions: list[str] = []
+    score_opening: int | None = None
+    score_content: int | None = None
+    score_delivery: int | None = None
+    score_grammar: int | None = None
+    score_overall: int | None = None
+    metrics: dict | None = None
+
+    @field_validator("suggestions", mode="before")
+    @classmethod
+    def legacy_suggestions(cls, value):
+        # Older exports stored suggestions as one ", "-joined string
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [s for s in value.split(", ") if s]
+        return value
+
+
+class ImportedSpeech(BaseModel):
+    transcript: str
+    feedback: ImportedFeedback = ImportedFeedback()
+    created_at: datetime | None = None
+
+
+class SpeechImport(BaseModel):
+    items: list[ImportedSpeech]
 
 
 class ChatRequest(BaseModel):
@@ -65,23 +160,21 @@ class ChatRequest(BaseModel):
     message: str
 
 
-# ------------------------------------------------
-# 🧠 Groq Whisper Setup
-# ------------------------------------------------
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
 # ------------------------------------------------
 # 🧱 ROUTES
 # ------------------------------------------------
 
 # ✅ User Signup
 @app.post("/signup")
-def signup(user: UserSignup, db: Session = Depends(get_db)):
-    existing = crud.get_user_by_email(db, user.email)
+async def signup(user: UserSignup, db: AsyncSession = Depends(get_async_db)):
+    existing = await db.run_sync(crud.get_user_by_email, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    new_user = crud.create_user(db, user.username, user.email, user.password)
+    password_hash = await ahash_password(user.password)
+    new_user = await db.run_sync(
+        crud.create_user, user.username, user.email, password_hash=password_hash
+    )
     return {
         "id": new_user.id,
         "username": new_user.username,
@@ -91,29 +184,38 @@ def signup(user: UserSignup, db: Session = Depends(get_db)):
 
 # ✅ User Login
 @app.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, user.email)
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(crud.get_user_by_email, user.email)
+    if not db_user or not await acheck_password(user.password, db_user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    token = create_access_token(data={"sub": db_user.email})
+    # 🔁 Upgrade hashes stored with a different bcrypt cost
+    if needs_rehash(db_user.password_hash):
+        new_hash = await ahash_password(user.password)
+        await db.run_sync(crud.update_password_hash, db_user.id, new_hash)
+
+    token = create_access_token(data={"sub": db_user.email, "uid": db_user.id})
     return {"access_token": token, "token_type": "bearer"}
 
 
 # ✅ Analyze Speech (Text Input)
 @app.post("/analyze")
-def analyze(
+async def analyze(
     speech: SpeechInput,
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user),
+    background: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
 ):
-    db_user = crud.get_user_by_email(db, current_user)
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
+    if speech.mode and speech.mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis mode: {speech.mode}")
+
+    if background:
+        return await enqueue_job(current_user.id, transcript=speech.transcript, mode=speech.mode)
 
     try:
-        feedback = orchestrate_analysis(speech.transcript)
-        speech_id = crud.save_speech(db, db_user.id, speech.transcript, feedback)
+        with span("analysis"):
+            feedback = await orchestrate_analysis_async(speech.transcript, speech.mode)
+        speech_id = await db.run_sync(crud.save_speech, current_user.id, speech.transcript, feedback)
         return {"speech_id": speech_id, "feedback": feedback}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
@@ -123,90 +225,342 @@ def analyze(
 @app.post("/analyze_audio")
 async def analyze_audio(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user),
+    background: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
 ):
-    db_user = crud.get_user_by_email(db, current_user)
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
+    # The multipart body was received and parsed before the route ran
+    record_since_request_start("upload_receive")
+    try:
+        with span("upload"):
+            tmp_path = await save_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
+    return await analyze_recording(tmp_path, background, db, current_user)
+
+
+async def analyze_recording(path: str, background: bool, db: AsyncSession, current_user: CurrentUser):
+    """Transcribe + analyze + save a recording on disk. The file is always deleted afterwards."""
+    if background:
+        # The worker transcribes and deletes the file
+        try:
+            return await enqueue_job(current_user.id, audio_path=path)
+        except HTTPException:
+            if os.path.exists(path):  # not yet handed over to the queue
+                os.remove(path)
+            raise
 
     try:
-        with open(tmp_path, "rb") as audio_file:
-            result = groq_client.audio.transcriptions.create(
-                file=audio_file,
-                model="whisper-large-v3",
-            )
-        transcript = result.text.strip()
+        with span("transcription"):
+            transcription = await transcribe_audio(path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
     finally:
-        os.remove(tmp_path)
+        os.remove(path)
+
+    transcript = transcription["text"]
+    with span("analysis"):
+        feedback = await orchestrate_analysis_async(transcript, duration=transcription["duration"])
+    speech_id = await db.run_sync(crud.save_speech, current_user.id, transcript, feedback)
+
+    return {
+        "speech_id": speech_id,
+        "transcript": transcript,
+        "words": transcription["words"],  # word timestamps in the original recording
+        "feedback": feedback,
+    }
+
+
+# 📤 Resumable Uploads (long recordings, unreliable connections)
+@app.post("/uploads", status_code=201)
+def create_upload(
+    data: UploadSessionCreate,
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    try:
+        return upload_sessions.create(current_user.id, data.total_size, data.filename)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/uploads/{upload_id}")
+def get_upload(upload_id: str, current_user: CurrentUser = Depends(get_current_db_user)):
+    try:
+        return upload_sessions.progress(upload_id, current_user.id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+@app.put("/uploads/{upload_id}")
+async def put_upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    """Append the raw request body at `offset`. On 409 resume from the returned offset."""
+    try:
+        return await upload_sessions.append(upload_id, current_user.id, offset, request.stream())
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except OffsetMismatch as e:
+        return JSONResponse(status_code=409, content={"detail": str(e), "offset": e.expected})
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@app.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    background: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    try:
+        path = await upload_sessions.finalize(upload_id, current_user.id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except UploadIncomplete as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return await analyze_recording(path, background, db, current_user)
+
+
+@app.delete("/uploads/{upload_id}")
+def abort_upload(upload_id: str, current_user: CurrentUser = Depends(get_current_db_user)):
+    try:
+        upload_sessions.abort(upload_id, current_user.id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return {"message": "Upload aborted"}
+
+
+# ✅ Batch Analysis (a whole class at once)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    batch: SpeechBatch,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    """Analyze many transcripts concurrently. Each item reports its own status; failures don't sink the batch."""
+    if batch.mode and batch.mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown analysis mode: {batch.mode}")
+    if len(batch.transcripts) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} transcripts per batch")
+
+    items = [{"index": i, "status": "failed", "error": "Empty transcript"} for i in range(len(batch.transcripts))]
+    pending = [i for i, transcript in enumerate(batch.transcripts) if transcript.strip()]
+
+    outcomes = await orchestrate_batch_async([batch.transcripts[i] for i in pending], batch.mode)
+    analyzed = []
+    for i, outcome in zip(pending, outcomes):
+        if isinstance(outcome, Exception):
+            items[i]["error"] = f"Analysis failed: {outcome}"
+        else:
+            analyzed.append(i)
+            items[i] = {"index": i, "status": "done", "feedback": outcome}
+
+    if analyzed:
+        try:
+            speech_ids = await db.run_sync(
+                crud.save_speeches,
+                current_user.id,
+                [{"transcript": batch.transcripts[i], "feedback": items[i]["feedback"]} for i in analyzed],
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Saving batch failed: {str(e)}")
+        for i, speech_id in zip(analyzed, speech_ids):
+            items[i]["speech_id"] = speech_id
 
-    feedback = orchestrate_analysis(transcript)
-    speech_id = crud.save_speech(db, db_user.id, transcript, feedback)
+    return {
+        "total": len(items),
+        "succeeded": len(analyzed),
+        "failed": len(items) - len(analyzed),
+        "items": items,
+    }
+
+
+# 📥 Bulk Import (migrations from other coaching tools)
+IMPORT_MAX_ITEMS = int(os.getenv("IMPORT_MAX_ITEMS", "10000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+
+@app.post("/speeches/import")
+async def import_speeches(
+    payload: SpeechImport,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    if len(payload.items) > IMPORT_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {IMPORT_MAX_ITEMS} items per import")
+
+    speech_ids = await db.run_sync(
+        crud.bulk_import_speeches,
+        current_user.id,
+        [item.model_dump() for item in payload.items],
+        batch_size=IMPORT_BATCH_SIZE,
+    )
+    return {"imported": len(speech_ids), "speech_ids": speech_ids}
+
+
+# ⏳ Background Analysis Jobs
+async def enqueue_job(user_id: int, **job):
+    try:
+        job_id = await job_queue.submit(user_id, **job)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return JSONResponse(status_code=202, content={"job_id": job_id, "status": "queued"})
+
+
+async def get_owned_job(job_id: str, current_user: CurrentUser):
+    job = await job_queue.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/stats")
+def jobs_stats(current_user: CurrentUser = Depends(get_current_db_user)):
+    return job_queue.stats()
 
-    return {"speech_id": speech_id, "transcript": transcript, "feedback": feedback}
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    job = await get_owned_job(job_id, current_user)
+    return job_status(job)
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    job = await get_owned_job(job_id, current_user)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {job.error}")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return job_result(job)
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
+    job = await get_owned_job(job_id, current_user)
+
+    async def stream():
+        async for status in job_queue.subscribe(job_id, job.user_id):
+            if status is None:
+                yield SSE_KEEPALIVE
+                continue
+            yield format_sse(status, event="status")
+            if status["status"] == "done":
+                done = await job_queue.get(job_id)
+                yield format_sse(job_result(done), event="result")
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ✅ Analysis Cache Stats
+@app.get("/cache/stats")
+def cache_stats(current_user: CurrentUser = Depends(get_current_db_user)):
+    return analysis_cache.stats()
+
+
+# ✅ LLM Client Stats (throttling, retries, circuit breaker)
+@app.get("/llm/stats")
+def get_llm_stats(current_user: CurrentUser = Depends(get_current_db_user)):
+    return llm_stats()
+
+
+# ✅ Prometheus metrics (route/agent/transcription/DB latency, LLM tokens, retries, cache hits)
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 
 # ✅ User History
+HISTORY_MAX_PAGE_SIZE = 100
+
+
 @app.get("/history")
-def get_history(
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user),
+async def get_history(
+    limit: int = 50,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
 ):
-    db_user = crud.get_user_by_email(db, current_user)
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    speeches = crud.get_user_speeches(db, db_user.id)
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    try:
+        speeches, next_cursor = await db.run_sync(
+            crud.get_user_speeches, current_user.id, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
         "user": {
-            "id": db_user.id,
-            "username": db_user.username,
-            "email": db_user.email,
+            "id": current_user.id,
+            "username": current_user.username,
+            "email": current_user.email,
         },
         "speeches": speeches,
+        "next_cursor": next_cursor,
     }
 
 
 # ✅ Analytics
 @app.get("/analytics")
-def analytics(
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user),
+async def analytics(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
 ):
-    db_user = crud.get_user_by_email(db, current_user)
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
-
-    analytics_data = crud.get_user_analytics(db, db_user.id)
+    analytics_data = await db.run_sync(crud.get_user_analytics, current_user.id)
     return analytics_data
 
 
 # ✅ Progress Tracking
 @app.get("/progress")
-def progress(
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user),
+async def progress(
+    bucket: str = "day",
+    days: int | None = None,
+    window: int = 3,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
 ):
-    db_user = crud.get_user_by_email(db, current_user)
-    if not db_user:
-        raise HTTPException(status_code=401, detail="User not found")
+    """
+    Bucketed progress series over the user's whole history. `bucket` is day | week | month,
+    `days` optionally limits it to the last N days and `window` is the moving-average length in buckets.
+    """
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}")
+    since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
 
-    progress_data = crud.get_progress_over_time(db, db_user.id)
+    progress_data = await db.run_sync(
+        crud.get_progress_over_time, current_user.id, bucket=bucket, since=since, window=max(1, window)
+    )
     return {
-        "user": db_user.username,
-        "total_sessions": len(progress_data),
-        "progress": progress_data or [],
+        "user": current_user.username,
+        "bucket": bucket,
+        "total_sessions": progress_data["total_sessions"],
+        "progress": progress_data["points"],
+        "series": progress_data["series"],
     }
 
 
 # ✅ Chatbot
-chatbot = create_chatbot()
+chat_sessions = SessionStore()
+chatbot = create_chatbot(chat_sessions)
 
 @app.post("/chat")
 async def chat(request: ChatRequest):
@@ -214,21 +568,48 @@ async def chat(request: ChatRequest):
     Intelligent chatbot endpoint that handles contextual dialogue.
     """
     try:
-        response = chatbot.invoke(
+        # Async path: throttling and retry backoff must not block the event loop
+        response = await chatbot.ainvoke(
             {"input": request.message},
             config={"configurable": {"session_id": request.session_id}},
         )
         return {"answer": response.get("answer", "⚠️ No response from AI.")}
     except Exception as e:
-        print("❌ Chatbot Error:", e)
+        logger.exception("chatbot request failed")
+        HANDLER_ERRORS.labels(handler="chat").inc()
         return {"error": str(e)}
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming chatbot endpoint. Sends answer tokens as server-sent events ("token"),
+    then a "done" event. The full answer is recorded in session history when the stream ends.
+    """
+    async def stream():
+        try:
+            async for chunk in chatbot.astream(
+                {"input": request.message},
+                config={"configurable": {"session_id": request.session_id}},
+            ):
+                token = chunk.get("answer")
+                if token:
+                    yield format_sse({"token": token}, event="token")
+            yield format_sse({"done": True}, event="done")
+        except Exception as e:
+            logger.exception("chatbot stream failed")
+            HANDLER_ERRORS.labels(handler="chat_stream").inc()
+            yield format_sse({"error": str(e)}, event="error")
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 # ✅ Speech Generator
-speech_llm = create_speech_generator()
+speech_sessions = SessionStore()
+speech_llm = create_speech_generator(speech_sessions)
 
-@app.post("/generate-speech")
-async def generate_speech(request: Request):
+async def read_speech_request(request: Request):
+    """Return (prompt, session_id) for the speech generator endpoints."""
     data = await request.json()
     user_input = data.get("input", "")
     session_id = data.get("session_id", "default")
@@ -239,8 +620,14 @@ async def generate_speech(request: Request):
     # 🧮 Convert duration to word count
     target_words = estimate_word_count(user_input)
     user_input += f" (Please write approximately {target_words} words.)"
+    return user_input, session_id
+
 
-    response = speech_llm.invoke(
+@app.post("/generate-speech")
+async def generate_speech(request: Request):
+    user_input, session_id = await read_speech_request(request)
+
+    response = await speech_llm.ainvoke(
         {"input": user_input},
         config={"configurable": {"session_id": session_id}},
     )
@@ -248,14 +635,61 @@ async def generate_speech(request: Request):
     answer = response.get("answer") if isinstance(response, dict) else getattr(response, "content", str(response))
     return {"answer": answer.strip()}
 
+
+@app.post("/generate-speech/stream")
+async def generate_speech_stream(request: Request):
+    """
+    Streaming speech generator. Sends tokens as server-sent events ("token"), then "done".
+    The completed speech is recorded in session history when the stream ends.
+    """
+    user_input, session_id = await read_speech_request(request)
+
+    async def stream():
+        try:
+            async for chunk in speech_llm.astream(
+                {"input": user_input},
+                config={"configurable": {"session_id": session_id}},
+            ):
+                token = chunk.get("answer") if isinstance(chunk, dict) else getattr(chunk, "content", "")
+                if token:
+                    yield format_sse({"token": token}, event="token")
+            yield format_sse({"done": True}, event="done")
+        except Exception as e:
+            logger.exception("speech generator stream failed")
+            HANDLER_ERRORS.labels(handler="generate_speech_stream").inc()
+            yield format_sse({"error": str(e)}, event="error")
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# ✅ Session Store Stats
+@app.get("/sessions/stats")
+def sessions_stats(current_user: CurrentUser = Depends(get_current_db_user)):
+    return {"chat": chat_sessions.stats(), "speech": speech_sessions.stats()}
+
+
 @app.put("/update_profile")
-def update_profile(data: dict, current_user: dict = Depends(get_current_user)):
+async def update_profile(
+    data: dict,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_db_user),
+):
     username = data.get("username")
     email = data.get("email")
-    # ✅ Update user in database (example)
-    user = db["users"].find_one_and_update(
-        {"_id": current_user["_id"]},
-        {"$set": {"username": username, "email": email}},
-        return_document=True,
-    )
-    return {"message": "Profile updated", "user": user}
+
+    try:
+        user = await db.run_sync(crud.update_user, current_user.id, username=username, email=email)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already registered")
+    invalidate_user(current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # The token's subject is the email, so hand back a fresh one
+    token = create_access_token(data={"sub": user.email, "uid": user.id})
+    return {
+        "message": "Profile updated",
+        "user": {"id": user.id, "username": user.username, "email": user.email},
+        "access_token": token,
+        "token_type": "bearer",
+    }
@@ -0,0 +1,152 @@
+"""
+Bounded store for chat/speech-generator session histories.
+
+Sessions are evicted least-recently-used past CHAT_MAX_SESSIONS and after
+CHAT_SESSION_TTL_SECONDS of inactivity. Each history keeps only a token-budgeted
+window of recent messages; older turns are folded into a running summary instead
+of being re-sent to the LLM on every turn.
+"""
+import os
+import asyncio
+import logging
+import threading
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "3600"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+SUMMARY_MAX_CHARS = 2000
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _message_text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+
+def extractive_summary(previous: str, messages: list[BaseMessage]) -> str:
+    """Cheap fallback summary: append the dropped turns and keep the most recent text."""
+    lines = [previous] if previous else []
+    for m in messages:
+        speaker = "User" if isinstance(m, HumanMessage) else "Assistant"
+        lines.append(f"{speaker}: {_message_text(m)[:300]}")
+    return "\n".join(lines)[-SUMMARY_MAX_CHARS:]
+
+
+def summarize_with(llm):
+    """Build a summarizer that asks an LLM to fold old turns into the running summary."""
+    def summarize(previous: str, messages: list[BaseMessage]) -> str:
+        transcript = extractive_summary("", messages)
+        prompt = (
+            "Update the running summary of this conversation with the new turns. "
+            "Keep names, goals, preferences and decisions; drop small talk. "
+            "Reply with the summary only, under 150 words.\n\n"
+            f"Current summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"
+        )
+        try:
+            return _message_text(llm.invoke([HumanMessage(content=prompt)])).strip()[:SUMMARY_MAX_CHARS]
+        except Exception as e:
+            logger.warning("history summarization failed, using extractive summary: %s", e)
+            return extractive_summary(previous, messages)
+    return summarize
+
+
+class WindowedChatHistory(BaseChatMessageHistory):
+    """Chat history holding a running summary plus a token-budgeted window of recent messages."""
+
+    def __init__(self, token_budget: int = HISTORY_TOKEN_BUDGET, summarize=None):
+        self.token_budget = token_budget
+        self.summarize = summarize or extractive_summary
+        self.summary = ""
+        self.window = []
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        with self._lock:
+            prefix = [SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}")] if self.summary else []
+            return prefix + list(self.window)
+
+    def add_messages(self, messages) -> None:
+        with self._lock:
+            self.window.extend(messages)
+            dropped = self._overflow()
+            if dropped:
+                self.summary = self.summarize(self.summary, dropped)
+
+    async def aadd_messages(self, messages) -> None:
+        """Used by ainvoke/astream: the (possibly LLM-backed) summary runs in a worker thread, off the event loop."""
+        with self._lock:
+            self.window.extend(messages)
+            dropped = self._overflow()
+            previous = self.summary
+        if dropped:
+            summary = await asyncio.to_thread(self.summarize, previous, dropped)
+            with self._lock:
+                self.summary = summary
+
+    def clear(self) -> None:
+        with self._lock:
+            self.summary = ""
+            self.window = []
+
+    def window_tokens(self) -> int:
+        return sum(estimate_tokens(_message_text(m)) for m in self.window)
+
+    def size_chars(self) -> int:
+        return len(self.summary) + sum(len(_message_text(m)) for m in self.window)
+
+    def _overflow(self) -> list[BaseMessage]:
+        """Once over budget, remove and return the oldest messages (to be summarized) until the window is at half budget."""
+        if self.window_tokens() <= self.token_budget:
+            return []
+        dropped = []
+        # Always keep the latest exchange verbatim
+        while len(self.window) > 2 and self.window_tokens() > self.token_budget // 2:
+            dropped.append(self.window.pop(0))
+        return dropped
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = MAX_SESSIONS, ttl: float = SESSION_TTL,
+                 token_budget: int = HISTORY_TOKEN_BUDGET, summarize=None):
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.summarizations = 0
+        self._sessions = TTLCache(maxsize=max_sessions, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def _summarize(self, previous, messages):
+        with self._lock:
+            self.summarizations += 1
+        return (self.summarize or extractive_summary)(previous, messages)
+
+    def get_history(self, session_id: str) -> BaseChatMessageHistory:
+        """Return the session's history, creating it if needed. Each access renews the TTL."""
+        with self._lock:
+            history = self._sessions.get(session_id)
+            if history is None:
+                history = WindowedChatHistory(self.token_budget, self._summarize)
+            self._sessions.set(session_id, history)
+            return history
+
+    def stats(self) -> dict:
+        self._sessions.expire()
+        histories = self._sessions.values()
+        return {
+            "sessions": len(histories),
+            "max_sessions": self._sessions.maxsize,
+            "messages": sum(len(h.window) for h in histories),
+            "window_tokens": sum(h.window_tokens() for h in histories),
+            "approx_bytes": sum(h.size_chars() for h in histories),
+            "lru_evictions": self._sessions.evictions,
+            "ttl_expirations": self._sessions.expirations,
+            "summarizations": self.summarizations,
+        }
@@ -0,0 +1,159 @@
+"""
+Deterministic speech metrics computed locally (no LLM), vectorized across transcripts.
+
+compute_metrics_batch tokenizes every transcript once, concatenates the tokens into
+one array and derives all counts with NumPy, so a whole batch or a backfill page
+costs about as much as one long transcript. The same numbers give a quick estimate
+of the delivery and grammar sections when those agents are unavailable.
+"""
+import re
+import numpy as np
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SENTENCE_END_RE = re.compile(r"[.!?]+")
+
+FILLER_WORDS = ("um", "umm", "uh", "uhm", "er", "erm", "ah", "hmm", "like", "basically", "literally", "actually")
+FILLER_PHRASES = (("you", "know"), ("i", "mean"), ("kind", "of"), ("sort", "of"))
+
+# Conversational pace for presentations
+IDEAL_WPM = (120, 160)
+IDEAL_SENTENCE_LENGTH = (10, 22)
+
+
+def _tokenize(text: str) -> list[str]:
+    return WORD_RE.findall((text or "").lower())
+
+
+def _sentence_count(text: str) -> int:
+    return sum(1 for part in SENTENCE_END_RE.split(text or "") if part.strip())
+
+
+def _round(values: np.ndarray, digits: int) -> list:
+    rounded = np.round(values.astype(float), digits)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+def compute_metrics_batch(transcripts: list[str], durations: list[float | None] | None = None) -> list[dict]:
+    """
+    Metrics for many transcripts at once. durations are audio lengths in seconds
+    (None when unknown, e.g. typed text), used for words per minute.
+    """
+    n = len(transcripts)
+    if n == 0:
+        return []
+
+    tokens = [_tokenize(t) for t in transcripts]
+    lengths = np.fromiter((len(t) for t in tokens), dtype=np.int64, count=n)
+    doc = np.repeat(np.arange(n), lengths)
+    vocab, ids = np.unique(np.array([w for t in tokens for w in t], dtype=str), return_inverse=True)
+    ids = ids.astype(np.int64)
+    v = max(len(vocab), 1)
+
+    words = lengths.astype(float)
+    safe_words = np.maximum(words, 1)
+
+    # Distinct words per transcript: unique (doc, word) pairs
+    unique_words = np.bincount(np.unique(doc * v + ids) // v, minlength=n) if len(ids) else np.zeros(n)
+
+    # Fillers: single words, plus two-word phrases matched on adjacent token pairs
+    filler_ids = np.flatnonzero(np.isin(vocab, FILLER_WORDS))
+    fillers = np.bincount(doc, weights=np.isin(ids, filler_ids), minlength=n)
+    same_doc = doc[1:] == doc[:-1]
+    if len(ids) > 1:
+        index = {word: i for i, word in enumerate(vocab)}
+        phrase_codes = [index[a] * v + index[b] for a, b in FILLER_PHRASES if a in index and b in index]
+        pairs = ids[:-1] * v + ids[1:]
+        phrase_hits = same_doc & np.isin(pairs, phrase_codes)
+        fillers += np.bincount(doc[:-1], weights=phrase_hits, minlength=n)
+        # Immediate repetitions ("I I think", "the the")
+        repeats = np.bincount(doc[:-1], weights=same_doc & (ids[1:] == ids[:-1]), minlength=n)
+    else:
+        repeats = np.zeros(n)
+
+    sentences = np.fromiter((_sentence_count(t) for t in transcripts), dtype=float, count=n)
+    durations = np.array([np.nan if d is None else d for d in (durations or [None] * n)], dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        wpm = np.where(durations > 0, words / (durations / 60), np.nan)
+        avg_sentence = np.where(sentences > 0, words / sentences, np.nan)
+
+    columns = {
+        "word_count": lengths.tolist(),
+        "sentence_count": sentences.astype(int).tolist(),
+        "duration_seconds": _round(durations, 1),
+        "words_per_minute": _round(wpm, 1),
+        "filler_count": fillers.astype(int).tolist(),
+        "filler_rate": _round(fillers / safe_words * 100, 2),  # per 100 words
+        "type_token_ratio": _round(np.where(words > 0, unique_words / safe_words, np.nan), 3),
+        "avg_sentence_length": _round(avg_sentence, 1),
+        "repetition_rate": _round(repeats / safe_words * 100, 2),  # per 100 words
+    }
+    return [{name: values[i] for name, values in columns.items()} for i in range(n)]
+
+
+def compute_metrics(transcript: str, duration: float | None = None) -> dict:
+    return compute_metrics_batch([transcript], [duration])[0]
+
+
+# ------------------------------------------------
+# 🩹 Estimated sections (agent fallback)
+# ------------------------------------------------
+def _clamp_score(value: float) -> int:
+    return int(min(10, max(1, round(value))))
+
+
+def _distance(value, low, high) -> float:
+    """How far value lies outside [low, high], as a fraction of the range's lower bound."""
+    if value is None:
+        return 0.0
+    if value < low:
+        return (low - value) / low
+    if value > high:
+        return (value - high) / low
+    return 0.0
+
+
+def estimate_delivery(metrics: dict) -> dict:
+    """Delivery section scored from pace, fillers and repetitions."""
+    weaknesses = []
+    score = 9.0
+    if metrics["filler_rate"] and metrics["filler_rate"] > 2:
+        score -= min(4, metrics["filler_rate"] / 2)
+        weaknesses.append("Reduce filler words")
+    if metrics["repetition_rate"] and metrics["repetition_rate"] > 1:
+        score -= min(2, metrics["repetition_rate"])
+        weaknesses.append("Avoid repeating words")
+    pace_off = _distance(metrics["words_per_minute"], *IDEAL_WPM)
+    if pace_off:
+        score -= min(3, pace_off * 6)
+        weaknesses.append("Speak slower" if metrics["words_per_minute"] > IDEAL_WPM[1] else "Speak a little faster")
+    return {
+        "summary": "Estimated from speech metrics (delivery analysis unavailable).",
+        "strengths": [],
+        "weaknesses": weaknesses,
+        "score": _clamp_score(score),
+        "estimated": True,
+    }
+
+
+def estimate_grammar(metrics: dict) -> dict:
+    """Grammar section scored from sentence length and vocabulary variety."""
+    weaknesses = []
+    score = 8.0
+    length_off = _distance(metrics["avg_sentence_length"], *IDEAL_SENTENCE_LENGTH)
+    if length_off:
+        score -= min(3, length_off * 4)
+        weaknesses.append("Use shorter sentences" if metrics["avg_sentence_length"] > IDEAL_SENTENCE_LENGTH[1]
+                          else "Combine very short sentences")
+    if metrics["type_token_ratio"] is not None and metrics["word_count"] >= 50 and metrics["type_token_ratio"] < 0.4:
+        score -= 2
+        weaknesses.append("Vary your vocabulary")
+    return {
+        "summary": "Estimated from speech metrics (grammar analysis unavailable).",
+        "strengths": [],
+        "weaknesses": weaknesses,
+        "score": _clamp_score(score),
+        "estimated": True,
+    }
+
+
+ESTIMATORS = {"delivery": estimate_delivery, "grammar": estimate_grammar}
@@ -0,0 +1,20 @@
+import json
+
+# Headers that keep proxies from buffering an event stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def format_sse(data, event: str = None) -> str:
+    """Format one server-sent event. Non-string data is sent as JSON."""
+    if not isinstance(data, str):
+        data = json.dumps(data, ensure_ascii=False, default=str)
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+# Comment line; keeps idle connections open through proxies
+SSE_KEEPALIVE = ": keepalive\n\n"
@@ -0,0 +1,46 @@
+# test_history_pagination.py
+import os
+import tempfile
+
+# crud/database read DATABASE_URL at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'history.db')}"
+
+from datetime import datetime, timezone
+from sqlalchemy import insert
+import crud
+from database import Base, engine, SessionLocal
+from models import User, Speech
+
+
+def test_history_pages_through_server_default_timestamps():
+    """Rows stamped by server_default=func.now() (no fractional seconds on SQLite) must not repeat."""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = User(username="pager", email="pager@example.com", password_hash="x")
+        db.add(user)
+        db.commit()
+
+        # Same-second server-side timestamps, plus Python-side ones with microseconds
+        db.execute(insert(Speech), [{"user_id": user.id, "transcript": f"speech {i}"} for i in range(7)])
+        db.execute(insert(Speech), [
+            {"user_id": user.id, "transcript": f"speech {i}", "created_at": datetime.now(timezone.utc)}
+            for i in range(7, 10)
+        ])
+        db.commit()
+        expected = sorted(db.query(Speech.id).filter(Speech.user_id == user.id).all())
+
+        seen, cursor = [], None
+        for _ in range(len(expected) + 1):  # more pages than rows means the cursor is stuck
+            page, cursor = crud.get_user_speeches(db, user.id, limit=2, cursor=cursor)
+            seen.extend(s["id"] for s in page)
+            if cursor is None:
+                break
+
+        assert cursor is None, "pagination did not terminate"
+        assert len(seen) == len(set(seen)), f"repeated ids: {seen}"
+        assert sorted(seen) == [row.id for row in expected]
+
+
+if __name__ == "__main__":
+    test_history_pages_through_server_default_timestamps()
+    print("✅ /history pagination walks every speech exactly once")
@@ -0,0 +1,209 @@
+"""
+Per-request timing breakdown and opt-in profiling.
+
+The timing middleware opens a root span per request, and span(name) or @timed(name)
+nest stages under it through a contextvar, so the stages also show up under
+asyncio.gather, to_thread and AsyncSession.run_sync. A stage that runs outside a
+request (the job worker, scripts) finds no root span and does nothing.
+
+Every response gets a Server-Timing header: one entry per stage name, durations
+summed, with the call count in desc when a stage ran more than once. Sending
+"X-Timing: tree" (or ?timing=tree) adds the whole span tree to JSON object
+responses under "_timing". With PROFILING_ENABLED=true, "X-Profile: 1" also records
+a pyinstrument sampling profile of that request (HTML) into PROFILE_DIR.
+"""
+import os
+import json
+import time
+import inspect
+import logging
+import tempfile
+import functools
+import contextvars
+from contextlib import contextmanager
+from fastapi.responses import Response
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # in requirements.txt; only needed with PROFILING_ENABLED
+    Profiler = None
+
+logger = logging.getLogger(__name__)
+
+TIMING_ENABLED = os.getenv("SERVER_TIMING", "true").lower() == "true"
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+if PROFILING_ENABLED and Profiler is None:
+    logger.warning("PROFILING_ENABLED is set but pyinstrument is not installed; profiling is off")
+    PROFILING_ENABLED = False
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "speaking_coach_profiles"))
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str, start: float | None = None):
+        self.name = name
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.children = []
+
+    @property
+    def ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self, origin: float | None = None) -> dict:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "ms": round(self.ms, 2),
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+_root = contextvars.ContextVar("timing_root", default=None)  # the request's span
+_current = contextvars.ContextVar("timing_span", default=None)  # innermost open span
+
+
+# ------------------------------------------------
+# ⏱ Spans
+# ------------------------------------------------
+@contextmanager
+def span(name: str):
+    """Time a stage under the current span (no-op outside an instrumented request)."""
+    parent = _current.get()
+    if parent is None:
+        yield
+        return
+    child = Span(name)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+def timed(name: str):
+    """Decorator form of span() for sync and async functions."""
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_since_request_start(name: str):
+    """Record a stage that began with the request, e.g. receiving the body before the route runs."""
+    root = _root.get()
+    if root is not None:
+        stage = Span(name, root.start)
+        stage.end = time.perf_counter()
+        _current.get().children.append(stage)
+
+
+# ------------------------------------------------
+# 🧾 Output
+# ------------------------------------------------
+def server_timing(root: Span) -> str:
+    totals = {}
+    pending = list(root.children)
+    while pending:
+        current = pending.pop(0)
+        ms, count = totals.get(current.name, (0.0, 0))
+        totals[current.name] = (ms + current.ms, count + 1)
+        pending.extend(current.children)
+
+    entries = [
+        f'{name};dur={ms:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for name, (ms, count) in totals.items()
+    ]
+    entries.append(f"total;dur={root.ms:.1f}")
+    return ", ".join(entries)
+
+
+def wants_tree(request) -> bool:
+    return request.headers.get("x-timing") == "tree" or request.query_params.get("timing") == "tree"
+
+
+async def _with_tree(response, root: Span):
+    """Rebuild a JSON object response with the span tree under "_timing". Other bodies pass through."""
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return response
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        data["_timing"] = root.to_dict()
+        body = json.dumps(data, default=str).encode()
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+# ------------------------------------------------
+# 🔬 Profiling
+# ------------------------------------------------
+_profiling = False  # one profile at a time; overlapping requests would mix into it
+
+
+def _profile_path(request) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    route = request.url.path.strip("/").replace("/", "_") or "root"
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{route}-{os.getpid()}.html")
+
+
+async def _profiled(request, call_next):
+    global _profiling
+    # async_mode="enabled" attributes samples to this request's task, not the whole loop
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    _profiling = True
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.stop()
+        _profiling = False
+        path = _profile_path(request)
+        with open(path, "w") as f:
+            f.write(profiler.output_html())
+    logger.info("profile of %s %s written to %s", request.method, request.url.path, path)
+    response.headers["X-Profile-File"] = os.path.basename(path)
+    return response
+
+
+# ------------------------------------------------
+# 🧩 Middleware
+# ------------------------------------------------
+async def instrument_request(request, call_next):
+    """Time the request (Server-Timing, optional tree) and profile it when asked to."""
+    if not TIMING_ENABLED:
+        return await call_next(request)
+
+    root = Span(request.url.path)
+    root_token, current_token = _root.set(root), _current.set(root)
+    try:
+        if PROFILING_ENABLED and not _profiling and request.headers.get("x-profile") == "1":
+            response = await _profiled(request, call_next)
+        else:
+            response = await call_next(request)
+    finally:
+        root.end = time.perf_counter()
+        _current.reset(current_token)
+        _root.reset(root_token)
+
+    response.headers["Server-Timing"] = server_timing(root)
+    if wants_tree(request):
+        response = await _with_tree(response, root)
+    return response
@@ -0,0 +1,150 @@
+"""
+Audio upload handling and Groq Whisper transcription that never blocks the event loop.
+
+With ffmpeg installed, uploads are preprocessed (16 kHz mono, compact codec, split at silences,
+see audio_processing.py), the segments are transcribed concurrently and stitched
+back together in order with word timestamps shifted to the original recording.
+"""
+import os
+import time
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+from dotenv import load_dotenv
+from fastapi import UploadFile
+from groq import AsyncGroq
+from audio_processing import prepare_audio, ffmpeg_available, AudioProcessingError
+from metrics import TRANSCRIPTION_LATENCY, TRANSCRIPTION_TOTAL_LATENCY
+from timing import span
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_MODEL = os.getenv("TRANSCRIPTION_MODEL", "whisper-large-v3")
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+AUDIO_PREPROCESSING = os.getenv("AUDIO_PREPROCESSING", "true").lower() == "true"
+TRANSCRIPTION_CONCURRENCY = int(os.getenv("TRANSCRIPTION_CONCURRENCY", "8"))
+
+groq_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+async def save_upload(file: UploadFile, suffix: str = ".webm", max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """
+    Stream an upload to a temp file in UPLOAD_CHUNK_SIZE pieces and return its path.
+    Raises UploadTooLarge (and removes the partial file) once max_bytes is exceeded.
+    """
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    total = 0
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            total += len(chunk)
+            if total > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit.")
+            await asyncio.to_thread(tmp.write, chunk)
+    except BaseException:
+        tmp.close()
+        os.remove(tmp.name)
+        raise
+    tmp.close()
+    return tmp.name
+
+
+async def groq_transcribe(path: str) -> dict:
+    """One Whisper request: {"text", "duration", "words": [{"word", "start", "end"}], "segments"}."""
+    result = await groq_client.audio.transcriptions.create(
+        file=Path(path),
+        model=TRANSCRIPTION_MODEL,
+        response_format="verbose_json",
+        timestamp_granularities=["word", "segment"],
+    )
+    return {
+        "text": result.text.strip(),
+        "duration": getattr(result, "duration", None),
+        "words": getattr(result, "words", None) or [],
+        "segments": getattr(result, "segments", None) or [],
+    }
+
+
+# Backend for a single file; benchmarks swap in a local stand-in with set_transcriber
+transcriber = groq_transcribe
+
+
+def set_transcriber(fn):
+    """Replace the per-file transcription backend. Returns the previous one."""
+    global transcriber
+    previous, transcriber = transcriber, fn
+    return previous
+
+
+async def _transcribe_one(path: str) -> dict:
+    start = time.perf_counter()
+    try:
+        with span("whisper"):
+            return await transcriber(path)
+    finally:
+        TRANSCRIPTION_LATENCY.labels(model=TRANSCRIPTION_MODEL).observe(time.perf_counter() - start)
+
+
+def _shift(items: list, offset: float) -> list:
+    return [{**item, "start": item["start"] + offset, "end": item["end"] + offset} for item in items]
+
+
+def stitch(parts: list[dict], offsets: list[float]) -> dict:
+    """Join per-segment results in order, moving timestamps onto the original recording's timeline."""
+    return {
+        "text": " ".join(part["text"] for part in parts if part["text"]),
+        "words": [w for part, offset in zip(parts, offsets) for w in _shift(part["words"], offset)],
+        "segments": [s for part, offset in zip(parts, offsets) for s in _shift(part["segments"], offset)],
+    }
+
+
+async def transcribe_audio(path: str) -> dict:
+    """
+    Transcribe a recording. Returns {"text", "duration", "words", "segments", "bytes_uploaded", "parts"}.
+    Falls back to sending the original file when ffmpeg is unavailable or can't decode it.
+    """
+    start = time.perf_counter()
+    if AUDIO_PREPROCESSING and ffmpeg_available():
+        with tempfile.TemporaryDirectory(prefix="speech-") as workdir:
+            try:
+                with span("preprocess"):
+                    prepared = await prepare_audio(path, workdir)
+            except AudioProcessingError as e:
+                logger.warning("audio preprocessing failed, sending original file: %s", e)
+            else:
+                limiter = asyncio.Semaphore(TRANSCRIPTION_CONCURRENCY)
+
+                async def transcribe_segment(segment):
+                    async with limiter:
+                        return await _transcribe_one(segment.path)
+
+                parts = await asyncio.gather(*(transcribe_segment(s) for s in prepared.segments))
+                TRANSCRIPTION_TOTAL_LATENCY.labels(path="preprocessed").observe(time.perf_counter() - start)
+                return {
+                    **stitch(parts, [s.start for s in prepared.segments]),
+                    "duration": prepared.duration,
+                    "bytes_uploaded": prepared.total_bytes,
+                    "parts": len(parts),
+                }
+
+    result = await _transcribe_one(path)
+    TRANSCRIPTION_TOTAL_LATENCY.labels(path="raw").observe(time.perf_counter() - start)
+    return {**result, "bytes_uploaded": os.path.getsize(path), "parts": 1}
+
+
+async def transcribe_with_duration(path: str) -> tuple[str, float | None]:
+    """Transcript text and audio duration (seconds, for pace metrics)."""
+    result = await transcribe_audio(path)
+    return result["text"], result["duration"]
+
+
+async def transcribe_file(path: str) -> str:
+    """Transcribe an audio file with Groq Whisper using the async client."""
+    text, _ = await transcribe_with_duration(path)
+    return text
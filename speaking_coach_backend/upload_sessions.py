@@ -0,0 +1,230 @@
+"""
+Resumable chunked uploads for long recordings.
+
+A client creates a session, PUTs chunks at explicit byte offsets, can ask for the
+current offset after a dropped connection, and finalizes once every byte has
+arrived. Chunks are streamed straight from the request body to UPLOAD_DIR/<id>.part,
+so nothing is buffered in memory. Metadata lives next to the data (<id>.json) so
+sessions survive restarts; sessions idle longer than UPLOAD_SESSION_TTL_SECONDS are
+garbage-collected by a background task started in the app lifespan.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+from transcription import MAX_UPLOAD_BYTES, UploadTooLarge
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "speaking_coach_uploads"))
+UPLOAD_SESSION_TTL_SECONDS = float(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+UPLOAD_GC_INTERVAL_SECONDS = float(os.getenv("UPLOAD_GC_INTERVAL_SECONDS", "600"))
+
+SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+ALLOWED_SUFFIXES = (".webm", ".ogg", ".mp3", ".m4a", ".mp4", ".wav", ".flac")
+
+
+class UploadSessionNotFound(Exception):
+    """Unknown, expired or someone else's upload session."""
+
+
+class OffsetMismatch(Exception):
+    """The chunk does not start where the stored data ends."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+class UploadIncomplete(Exception):
+    """Finalize was called before every declared byte arrived."""
+
+
+class UploadSessionStore:
+    def __init__(self, directory: str = UPLOAD_DIR, ttl: float = UPLOAD_SESSION_TTL_SECONDS,
+                 max_bytes: int = MAX_UPLOAD_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._locks = {}  # session id -> asyncio.Lock (one writer per session)
+        self._gc_task = None
+        os.makedirs(directory, exist_ok=True)
+
+    # ------------------------------------------------
+    # Paths & metadata
+    # ------------------------------------------------
+    def _data_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.part")
+
+    def _meta_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def _load(self, session_id: str, user_id: int) -> dict:
+        if not SESSION_ID_RE.match(session_id or ""):
+            raise UploadSessionNotFound(session_id)
+        try:
+            with open(self._meta_path(session_id)) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            raise UploadSessionNotFound(session_id)
+        if meta["user_id"] != user_id:
+            raise UploadSessionNotFound(session_id)
+        return meta
+
+    def _progress(self, session_id: str, meta: dict) -> dict:
+        data = self._data_path(session_id)
+        try:
+            offset = os.path.getsize(data)
+            expires_at = os.path.getmtime(data) + self.ttl
+        except FileNotFoundError:  # finalized, aborted or collected meanwhile
+            raise UploadSessionNotFound(session_id)
+        return {
+            "upload_id": session_id,
+            "offset": offset,
+            "total_size": meta["total_size"],
+            "complete": offset == meta["total_size"],
+            "expires_at": expires_at,
+        }
+
+    def _check_open(self, session_id: str):
+        """Under the session lock: the session may have been finalized or aborted while we waited."""
+        if not (os.path.exists(self._meta_path(session_id)) and os.path.exists(self._data_path(session_id))):
+            raise UploadSessionNotFound(session_id)
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(session_id, asyncio.Lock())
+
+    def _remove(self, session_id: str):
+        for path in (self._data_path(session_id), self._meta_path(session_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._locks.pop(session_id, None)
+
+    # ------------------------------------------------
+    # API
+    # ------------------------------------------------
+    def create(self, user_id: int, total_size: int, filename: str = "") -> dict:
+        if total_size <= 0:
+            raise ValueError("total_size must be positive")
+        if total_size > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds the {self.max_bytes // (1024 * 1024)} MB limit.")
+        suffix = os.path.splitext(filename or "")[1].lower()
+        session_id = uuid.uuid4().hex
+        meta = {
+            "user_id": user_id,
+            "total_size": total_size,
+            "suffix": suffix if suffix in ALLOWED_SUFFIXES else ".webm",
+            "created_at": time.time(),
+        }
+        open(self._data_path(session_id), "wb").close()
+        with open(self._meta_path(session_id), "w") as f:
+            json.dump(meta, f)
+        return self._progress(session_id, meta)
+
+    def progress(self, session_id: str, user_id: int) -> dict:
+        return self._progress(session_id, self._load(session_id, user_id))
+
+    async def append(self, session_id: str, user_id: int, offset: int, chunks) -> dict:
+        """
+        Append an async iterable of bytes (the request body) at `offset`.
+        Bytes that arrived before a dropped connection are kept, so the client resumes from progress().
+        """
+        meta = self._load(session_id, user_id)
+        async with self._lock(session_id):
+            self._check_open(session_id)
+            path = self._data_path(session_id)
+            current = os.path.getsize(path)
+            if offset != current:
+                raise OffsetMismatch(current)
+
+            with open(path, "ab") as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if current + len(chunk) > meta["total_size"]:
+                        raise UploadTooLarge("Chunk runs past the declared total_size.")
+                    await asyncio.to_thread(f.write, chunk)
+                    current += len(chunk)
+        return self._progress(session_id, meta)
+
+    async def finalize(self, session_id: str, user_id: int) -> str:
+        """
+        Close the session and return the path of the complete recording. The caller owns
+        it from here: it deletes it or hands it to the job queue, which moves it out of UPLOAD_DIR.
+        """
+        meta = self._load(session_id, user_id)
+        async with self._lock(session_id):
+            self._check_open(session_id)
+            data = self._data_path(session_id)
+            received = os.path.getsize(data)
+            if received != meta["total_size"]:
+                raise UploadIncomplete(f"Received {received} of {meta['total_size']} bytes.")
+            final = os.path.join(self.directory, f"{session_id}{meta['suffix']}")
+            os.replace(data, final)
+            os.remove(self._meta_path(session_id))
+        self._locks.pop(session_id, None)
+        return final
+
+    def abort(self, session_id: str, user_id: int):
+        self._load(session_id, user_id)
+        self._remove(session_id)
+
+    # ------------------------------------------------
+    # Garbage collection
+    # ------------------------------------------------
+    def collect_garbage(self) -> int:
+        """
+        Delete sessions whose data hasn't changed for `ttl` seconds, plus expired data files
+        without a session record (finalized recordings orphaned by a crash before hand-off).
+        Recordings handed to the job queue live in its own directory and are never touched here.
+        Returns how many sessions/files were removed.
+        """
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for name in os.listdir(self.directory):
+            session_id, ext = os.path.splitext(name)
+            if not SESSION_ID_RE.match(session_id):
+                continue
+            if ext != ".json":
+                path = os.path.join(self.directory, name)
+                orphaned = not os.path.exists(self._meta_path(session_id)) and session_id not in self._locks
+                try:
+                    if orphaned and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass  # handed off and deleted meanwhile
+                continue
+            data = self._data_path(session_id)
+            last_write = os.path.getmtime(data if os.path.exists(data) else os.path.join(self.directory, name))
+            lock = self._locks.get(session_id)
+            if last_write < cutoff and not (lock and lock.locked()):
+                self._remove(session_id)
+                removed += 1
+        return removed
+
+    async def _gc_loop(self, interval: float):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.collect_garbage)
+                if removed:
+                    logger.info("removed %d stale upload sessions", removed)
+            except Exception:
+                logger.exception("upload session cleanup failed")
+            await asyncio.sleep(interval)
+
+    def start_gc(self, interval: float = UPLOAD_GC_INTERVAL_SECONDS):
+        self._gc_task = asyncio.create_task(self._gc_loop(interval))
+
+    async def stop_gc(self):
+        if self._gc_task:
+            self._gc_task.cancel()
+            await asyncio.gather(self._gc_task, return_exceptions=True)
+            self._gc_task = None
+
+
+upload_sessions = UploadSessionStore()